@@ -0,0 +1,87 @@
+from __future__ import annotations
+import struct
+from typing import BinaryIO, Iterator, NamedTuple, Optional, Type, TYPE_CHECKING
+
+from actions import Action, ActionWithDirection, BumpAction, DropItem, ItemAction, MeleeAction, MovementAction, PickupAction, WaitAction
+
+if TYPE_CHECKING:
+	from engine import Engine
+
+# An action log is a header naming how the game was started, followed by one fixed-size record per
+# player action passed to EventHandler.handle_action, in order. Replaying the records against a game
+# started the same way reproduces the session, since every random draw comes from the seeded streams.
+
+MAGIC = b"SRAL"
+LOG_VERSION = 1
+# magic, version, master seed as two 64-bit halves, map width, map height, chunk size (0 for dense)
+HEADER = struct.Struct("<4sBQQIII")
+# action kind, dx, dy, inventory index of the item used (-1 for none), target x, target y
+RECORD = struct.Struct("<Bbbhii")
+
+# record kinds, by position
+ACTION_KINDS = [WaitAction, PickupAction, BumpAction, MovementAction, MeleeAction, ItemAction, DropItem]
+_KIND_IDS = {cls: kind for kind, cls in enumerate(ACTION_KINDS)}
+
+class LogHeader(NamedTuple):
+	seed: int
+	map_width: int
+	map_height: int
+	chunk_size: Optional[int]
+
+class ActionRecorder:
+	def __init__(self, path: str, engine: Engine):
+		game_map = engine.game_map
+		seed = engine.rng.seed
+		self.file: BinaryIO = open(path, "wb")
+		self.file.write(HEADER.pack(
+			MAGIC, LOG_VERSION, seed & (2**64 - 1), seed >> 64, game_map.width, game_map.height, game_map.chunk_size or 0
+		))
+		self.count = 0
+
+	def record(self, action: Action) -> None:
+		# call before the action is performed, while an item being used is still in the inventory
+		dx = dy = 0
+		item_index = -1
+		target_x = target_y = 0
+
+		if isinstance(action, ActionWithDirection):
+			dx, dy = action.dx, action.dy
+		elif isinstance(action, ItemAction):
+			item_index = action.entity.inventory.items.index(action.item)
+			target_x, target_y = action.target_xy
+
+		self.file.write(RECORD.pack(_KIND_IDS[type(action)], dx, dy, item_index, target_x, target_y))
+		self.count += 1
+
+	def close(self) -> None:
+		self.file.close()
+
+def read_header(log_file: BinaryIO) -> LogHeader:
+	magic, version, seed_low, seed_high, map_width, map_height, chunk_size = HEADER.unpack(log_file.read(HEADER.size))
+	if magic != MAGIC or version != LOG_VERSION:
+		raise ValueError("Not a supported action log.")
+	return LogHeader(seed_low | (seed_high << 64), map_width, map_height, chunk_size or None)
+
+def read_records(log_file: BinaryIO) -> Iterator[tuple]:
+	data = log_file.read()
+	yield from RECORD.iter_unpack(data[:len(data) - len(data) % RECORD.size])
+
+def decode(record: tuple, engine: Engine) -> Action:
+	# rebuilds a recorded action for the current player
+	kind, dx, dy, item_index, target_x, target_y = record
+	player = engine.player
+	cls: Type[Action] = ACTION_KINDS[kind]
+
+	if issubclass(cls, ActionWithDirection):
+		return cls(player, dx, dy)
+	if issubclass(cls, ItemAction):
+		return cls(player, player.inventory.items[item_index], (target_x, target_y))
+	return cls(player)
+
+class LoggedActionPolicy:
+	# a headless policy feeding the recorded actions back in order
+	def __init__(self, records: Iterator[tuple]):
+		self.records = iter(records)
+
+	def __call__(self, engine: Engine) -> Optional[Action]:
+		return decode(next(self.records), engine)
@@ -1,14 +1,23 @@
 from __future__ import annotations
 from typing import Optional, Tuple, TYPE_CHECKING
 import color
+from entity import Item
 import exceptions
 
 if TYPE_CHECKING:
 	from engine import Engine
-	from entity import Actor, Entity, Item
+	from entity import Actor, Entity
+
+# time an ordinary action takes an actor of normal speed, see scheduler.py
+ACTION_COST = 100
 
 # Generic action class which all other inherit
 class Action:
+	__slots__ = ("entity",)
+
+	# override in subclasses that take more or less time than an ordinary action
+	cost: int = ACTION_COST
+
 	def __init__(self, entity: Actor) -> None:
 		super().__init__()
 		self.entity = entity
@@ -53,12 +62,12 @@ class PickupAction(Action):
 		actor_location_y = self.entity.y
 		inventory = self.entity.inventory
 
-		for item in self.engine.game_map.items:
-			if actor_location_x == item.x and actor_location_y == item.y:
+		for item in self.engine.game_map.get_entities_at_location(actor_location_x, actor_location_y):
+			if isinstance(item, Item):
 				if len(inventory.items) >= inventory.capacity:
 					raise exceptions.Impossible("Edwards has full pockets.")
 
-				self.engine.game_map.entities.remove(item)
+				self.engine.game_map.remove_entity(item)
 				item.parent = self.entity.inventory
 				inventory.items.append(item)
 
@@ -128,7 +137,7 @@ class MovementAction(ActionWithDirection):
 
 		if not self.engine.game_map.in_bounds(dest_x, dest_y):
 			raise exceptions.Impossible("The way is blocked.")
-		if not self.engine.game_map.tiles["walkable"][dest_x,dest_y]:
+		if not self.engine.game_map.get_walkable((dest_x, dest_y)):
 			raise exceptions.Impossible("Edwards is backed against the wall...")
 		if self.engine.game_map.get_blocking_entity_at_location(dest_x, dest_y):
 			raise exceptions.Impossible("There's someone in the way.")
@@ -0,0 +1,103 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:
+	from entity import Actor
+
+class ActorStore:
+	# Column store mirroring the actors on a map: one slot per actor across parallel NumPy arrays,
+	# kept in sync by GameMap and Fighter so area and targeting queries run as array operations
+
+	def __init__(self, capacity: int = 64):
+		self.x = np.zeros(capacity, dtype=np.int32)
+		self.y = np.zeros(capacity, dtype=np.int32)
+		self.hp = np.zeros(capacity, dtype=np.int32)
+		self.power = np.zeros(capacity, dtype=np.int32)
+		self.defense = np.zeros(capacity, dtype=np.int32)
+		self.alive = np.zeros(capacity, dtype=bool)
+
+		self.actors: List[Optional[Actor]] = [None] * capacity
+		self.slots: Dict[Actor, int] = {}
+		self._free_slots: List[int] = []
+		self.size = 0 # slots in use or freed, everything past this is untouched
+
+	def __len__(self) -> int:
+		return len(self.slots)
+
+	def add(self, actor: Actor) -> None:
+		if self._free_slots:
+			slot = self._free_slots.pop()
+		else:
+			if self.size == len(self.actors):
+				self._grow()
+			slot = self.size
+			self.size += 1
+
+		self.slots[actor] = slot
+		self.actors[slot] = actor
+		self.update(actor)
+
+	def remove(self, actor: Actor) -> None:
+		slot = self.slots.pop(actor)
+		self.actors[slot] = None
+		self.alive[slot] = False
+		self._free_slots.append(slot)
+
+	def update(self, actor: Actor) -> None:
+		# call after an actor moves, dies or has its fighter stats changed
+		slot = self.slots[actor]
+		self.x[slot] = actor.x
+		self.y[slot] = actor.y
+		self.hp[slot] = actor.fighter.hp
+		self.power[slot] = actor.fighter.power
+		self.defense[slot] = actor.fighter.defense
+		self.alive[slot] = actor.is_alive
+
+	def _grow(self) -> None:
+		capacity = len(self.actors) * 2
+		for column in ("x", "y", "hp", "power", "defense", "alive"):
+			old = getattr(self, column)
+			new = np.zeros(capacity, dtype=old.dtype)
+			new[:len(old)] = old
+			setattr(self, column, new)
+		self.actors.extend([None] * (capacity - len(self.actors)))
+
+	def distances(self, x: int, y: int) -> np.ndarray:
+		# euclidean distance from (x, y) to every slot in use
+		return np.hypot(self.x[:self.size] - x, self.y[:self.size] - y)
+
+	def visible_mask(self, visible: np.ndarray) -> np.ndarray:
+		# which slots hold a living actor standing on a visible cell
+		return self.alive[:self.size] & visible[self.x[:self.size], self.y[:self.size]]
+
+	def within_radius(self, x: int, y: int, radius: float) -> List[Actor]:
+		# living actors at most radius away from (x, y)
+		slots = np.flatnonzero(self.alive[:self.size] & (self.distances(x, y) <= radius))
+		return [self.actors[slot] for slot in slots.tolist()]
+
+	def within_steps(self, x: int, y: int, steps: int) -> List[Actor]:
+		# living actors at most steps moves away from (x, y), counting diagonal moves as one
+		near = (np.abs(self.x[:self.size] - x) <= steps) & (np.abs(self.y[:self.size] - y) <= steps)
+		slots = np.flatnonzero(self.alive[:self.size] & near)
+		return [self.actors[slot] for slot in slots.tolist()]
+
+	def staggered(self, turn: int, interval: int) -> List[Actor]:
+		# the living actors whose slot comes up on this turn, so each is picked once every interval turns
+		slots = np.flatnonzero(self.alive[turn % interval:self.size:interval]) * interval + turn % interval
+		return [self.actors[slot] for slot in slots.tolist()]
+
+	def nearest_visible(self, x: int, y: int, visible: np.ndarray, max_distance: float, exclude: Optional[Actor] = None) -> Optional[Actor]:
+		# the closest living, visible actor strictly nearer than max_distance, other than exclude
+		candidates = self.visible_mask(visible)
+		if exclude is not None and exclude in self.slots:
+			candidates[self.slots[exclude]] = False
+
+		distances = np.where(candidates, self.distances(x, y), np.inf)
+		if not distances.size:
+			return None
+
+		slot = int(distances.argmin())
+		if distances[slot] >= max_distance:
+			return None
+		return self.actors[slot]
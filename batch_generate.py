@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# Generates a run of seeded levels across every core, printing a digest of each one as a JSON line
+# Levels only depend on the master seed and their number, so --check can confirm the parallel results
+# are bit-identical to generating the same levels one after another in this process
+from __future__ import annotations
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from level_pipeline import LevelPayload, LevelSettings, generate_level_payload
+
+def payload_digest(payload: LevelPayload) -> str:
+	digest = hashlib.sha256()
+	tiles = payload.tiles if isinstance(payload.tiles, tuple) else (payload.tiles,)
+	for array in (*tiles, payload.spawns, payload.spawn_xs, payload.spawn_ys, np.array(payload.player_start)):
+		digest.update(np.ascontiguousarray(array).tobytes())
+	return digest.hexdigest()
+
+def save_payload(payload: LevelPayload, path: str) -> None:
+	if isinstance(payload.tiles, tuple):
+		tiles = {"tile_chunk_keys": payload.tiles[0], "tile_chunks": payload.tiles[1]}
+	else:
+		tiles = {"tiles": payload.tiles}
+	np.savez(
+		path,
+		player_start = np.array(payload.player_start),
+		spawns = payload.spawns,
+		spawn_xs = payload.spawn_xs,
+		spawn_ys = payload.spawn_ys,
+		**tiles
+	)
+
+def generate_levels(settings: LevelSettings, seed: int, levels: List[int], workers: Optional[int]) -> Iterator[LevelPayload]:
+	# payloads in level order, generated on a process pool, or in this process when workers is 0
+	if workers == 0:
+		for level in levels:
+			yield generate_level_payload(settings, seed, level)
+		return
+
+	with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as executor:
+		yield from executor.map(generate_level_payload, [settings] * len(levels), [seed] * len(levels), levels)
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description = "Generate seeded StrangeRL levels in parallel.")
+	parser.add_argument("--seed", type = int, required = True)
+	parser.add_argument("--count", type = int, default = 100)
+	parser.add_argument("--first-level", type = int, default = 1)
+	parser.add_argument("--map-size", type = int, default = 64)
+	parser.add_argument("--max-rooms", type = int, default = 32)
+	parser.add_argument("--chunk-size", type = int, default = None)
+	parser.add_argument("--workers", type = int, default = None, help = "worker processes, 0 generates in this process")
+	parser.add_argument("--output", metavar = "DIRECTORY", help = "also write each level as level_<n>.npz")
+	parser.add_argument("--check", action = "store_true", help = "regenerate sequentially and fail on any difference")
+	args = parser.parse_args()
+
+	settings = LevelSettings(
+		map_width = args.map_size,
+		map_height = args.map_size,
+		max_rooms = args.max_rooms,
+		chunk_size = args.chunk_size
+	)
+	levels = list(range(args.first_level, args.first_level + args.count))
+	if args.output:
+		os.makedirs(args.output, exist_ok = True)
+
+	digests: Dict[int, str] = {}
+	start = time.perf_counter()
+	for level, payload in zip(levels, generate_levels(settings, args.seed, levels, args.workers)):
+		digests[level] = payload_digest(payload)
+		if args.output:
+			save_payload(payload, os.path.join(args.output, f"level_{level}.npz"))
+		print(json.dumps({"seed": args.seed, "level": level, "entities": len(payload.spawns), "digest": digests[level]}), flush = True)
+	print(f"{len(levels)} levels in {time.perf_counter() - start:.2f}s", file = sys.stderr)
+
+	if args.check:
+		mismatched = [
+			level for level, payload in zip(levels, generate_levels(settings, args.seed, levels, 0))
+			if payload_digest(payload) != digests[level]
+		]
+		if mismatched:
+			sys.exit(f"levels {mismatched} differ from sequential generation")
+		print("parallel and sequential generation are identical", file = sys.stderr)
+
+
+if __name__ == "__main__":
+	main()
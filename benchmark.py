@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# Seeded benchmarks of the per-turn hot paths across map sizes and monster densities
+# Prints one JSON object per (map size, monster count, phase) so runs can be diffed between commits
+from __future__ import annotations
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterator, List, Optional, TYPE_CHECKING
+import numpy as np
+import tcod
+
+from engine import Engine
+import entity_factories
+from procgen import generate_dungeon
+from rng import RandomStreams
+
+if TYPE_CHECKING:
+	from game_map import GameMap
+
+DEFAULT_SIZES = [64, 128, 256, 512, 1024]
+DEFAULT_MONSTERS = [0, 1000, 4000]
+
+def new_engine(map_size: int, chunk_size: Optional[int] = None, seed: Optional[int] = None) -> Engine:
+	# same room and population settings as setup_game, with the room count scaled to the map area
+	player = entity_factories.player.build()
+	engine = Engine(player = player, rng = RandomStreams(seed))
+	engine.game_map = generate_dungeon(
+		max_rooms = 32 * max(1, (map_size * map_size) // (64 * 64)),
+		room_min_size = 8,
+		room_max_size = 16,
+		map_width = map_size,
+		map_height = map_size,
+		max_monsters_per_room = 3,
+		max_items_per_room = 5,
+		engine = engine,
+		chunk_size = chunk_size
+	)
+	engine.update_fov()
+	return engine
+
+def floor_cells(game_map: GameMap) -> np.ndarray:
+	return np.argwhere(game_map.get_walkable())
+
+def add_monsters(engine: Engine, count: int) -> None:
+	# scatters extra monsters over free floor, on top of what generate_dungeon placed
+	game_map = engine.game_map
+	free = [(x, y) for x, y in floor_cells(game_map).tolist() if not game_map.occupancy[x, y]]
+	for x, y in random.sample(free, min(count, len(free))):
+		random.choice([entity_factories.junkie, entity_factories.roider]).spawn(game_map, x, y)
+
+def bench_spawn(engine: Engine, map_size: int) -> Callable[[], None]:
+	# spawns a batch of monsters and items onto free floor, then clears them off again
+	game_map = engine.game_map
+	free = [(x, y) for x, y in floor_cells(game_map).tolist() if not game_map.occupancy[x, y]]
+	cells = random.sample(free, min(1000, len(free)))
+	prototypes = [entity_factories.junkie, entity_factories.smart_bandage]
+
+	def run() -> None:
+		spawned = [prototypes[i % 2].spawn(game_map, x, y) for i, (x, y) in enumerate(cells)]
+		for entity in spawned:
+			game_map.remove_entity(entity)
+	return run
+
+def bench_procgen(engine: Engine, map_size: int) -> Callable[[], None]:
+	return lambda: new_engine(map_size, engine.game_map.chunk_size, engine.rng.seed)
+
+def bench_fov(engine: Engine, map_size: int) -> Callable[[], None]:
+	# jumps the player between floor cells so every call really recomputes
+	cells = floor_cells(engine.game_map).tolist()
+	player = engine.player
+
+	def run() -> None:
+		player.place(*random.choice(cells))
+		engine.update_fov()
+	return run
+
+def bench_enemy_turns(engine: Engine, map_size: int) -> Callable[[], None]:
+	return engine.handle_enemy_turns
+
+def bench_get_path_to(engine: Engine, map_size: int) -> Callable[[], None]:
+	monsters = [actor for actor in engine.game_map.actors if actor is not engine.player]
+	player = engine.player
+
+	def run() -> None:
+		if monsters:
+			random.choice(monsters).ai.get_path_to(player.x, player.y)
+	return run
+
+def bench_render(engine: Engine, map_size: int) -> Callable[[], None]:
+	console = tcod.console.Console(64, 72, order="F")
+	engine.camera.center_on(engine.player.x, engine.player.y, map_size, map_size)
+
+	def run() -> None:
+		console.clear()
+		engine.game_map.render(console, engine.camera)
+	return run
+
+def bench_message_log(engine: Engine, map_size: int) -> Callable[[], None]:
+	console = tcod.console.Console(64, 72, order="F")
+	for i in range(200):
+		engine.message_log.add_message(f"The junkie swings at Edwards for {i} damage!")
+
+	def run() -> None:
+		console.clear()
+		engine.message_log.render(console = console, x = 8, y = 65, width = 48, height = 6)
+	return run
+
+PHASES: Dict[str, Callable[[Engine, int], Callable[[], None]]] = {
+	"procgen": bench_procgen,
+	"spawn": bench_spawn,
+	"fov": bench_fov,
+	"enemy_turns": bench_enemy_turns,
+	"get_path_to": bench_get_path_to,
+	"render": bench_render,
+	"message_log": bench_message_log,
+}
+
+def time_calls(func: Callable[[], None], repeat: int) -> List[float]:
+	timings = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		func()
+		timings.append(time.perf_counter() - start)
+	return timings
+
+def peak_memory(func: Callable[[], None]) -> int:
+	# traced separately from the timed calls, since tracemalloc slows allocation down
+	tracemalloc.start()
+	try:
+		func()
+		return tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+def git_commit() -> Optional[str]:
+	try:
+		return subprocess.run(
+			["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True, check = True
+		).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+def run_benchmarks(
+	sizes: List[int],
+	monster_counts: List[int],
+	phases: List[str],
+	repeat: int,
+	seed: int,
+	chunk_size: Optional[int] = None
+) -> Iterator[Dict[str, object]]:
+	commit = git_commit()
+
+	for map_size in sizes:
+		for monsters in monster_counts:
+			random.seed(seed)
+			engine = new_engine(map_size, chunk_size, seed)
+			add_monsters(engine, monsters)
+
+			for phase in phases:
+				# reseed per phase so each phase sees the same draws no matter which others ran
+				random.seed(seed)
+				func = PHASES[phase](engine, map_size)
+				timings = time_calls(func, repeat)
+				yield {
+					"commit": commit,
+					"seed": seed,
+					"map_size": map_size,
+					"monsters": monsters,
+					"chunk_size": chunk_size,
+					"entities": len(engine.game_map.entities),
+					"phase": phase,
+					"repeat": repeat,
+					"mean_ms": 1000 * sum(timings) / len(timings),
+					"min_ms": 1000 * min(timings),
+					"max_ms": 1000 * max(timings),
+					"peak_kb": peak_memory(func) / 1024,
+				}
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description = "Benchmark StrangeRL hot paths, printing one JSON object per line.")
+	parser.add_argument("--sizes", type = int, nargs = "+", default = DEFAULT_SIZES)
+	parser.add_argument("--monsters", type = int, nargs = "+", default = DEFAULT_MONSTERS, help = "extra monsters spawned per map")
+	parser.add_argument("--phases", nargs = "+", choices = list(PHASES), default = list(PHASES))
+	parser.add_argument("--repeat", type = int, default = 20)
+	parser.add_argument("--seed", type = int, default = 0)
+	parser.add_argument("--chunk-size", type = int, default = None, help = "store maps in lazily allocated chunks of this size")
+	parser.add_argument("--output", type = argparse.FileType("w"), default = sys.stdout)
+	args = parser.parse_args()
+
+	for result in run_benchmarks(args.sizes, args.monsters, args.phases, args.repeat, args.seed, args.chunk_size):
+		print(json.dumps(result), file = args.output, flush = True)
+
+
+if __name__ == "__main__":
+	main()
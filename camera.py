@@ -0,0 +1,29 @@
+from typing import Optional, Tuple
+
+class Camera:
+	# The part of the map drawn on screen, anchored at the top-left of the console.
+	# x and y are the map coordinates shown in the viewport's top-left cell
+
+	def __init__(self, width: int, height: int):
+		self.width = width
+		self.height = height
+		self.x = 0
+		self.y = 0
+
+	def center_on(self, x: int, y: int, map_width: int, map_height: int) -> None:
+		# follows the point, but stops at the map edges rather than showing space beyond them
+		self.x = max(0, min(x - self.width // 2, map_width - self.width))
+		self.y = max(0, min(y - self.height // 2, map_height - self.height))
+
+	def region(self, map_width: int, map_height: int) -> Tuple[slice, slice]:
+		# map slices currently on screen, clipped to maps smaller than the viewport
+		return slice(self.x, min(self.x + self.width, map_width)), slice(self.y, min(self.y + self.height, map_height))
+
+	def to_map(self, x: int, y: int) -> Optional[Tuple[int, int]]:
+		# map coordinates under a console tile, or None if the tile is outside the viewport
+		if not (0 <= x < self.width and 0 <= y < self.height):
+			return None
+		return x + self.x, y + self.y
+
+	def to_screen(self, x: int, y: int) -> Tuple[int, int]:
+		return x - self.x, y - self.y
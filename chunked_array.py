@@ -0,0 +1,124 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterator, Tuple, Union
+import numpy as np
+
+Index = Union[int, slice, np.ndarray]
+
+class ChunkedArray:
+	# A 2D array split into square chunks that are only allocated once something other than
+	# fill_value is written into them, so mostly untouched maps cost little memory.
+	# Supports the indexing GameMap relies on: a single cell, a rectangle of slices (read as a
+	# dense copy), and gathering cells from arrays of x and y coordinates.
+	# Negative indices and slice steps are not supported.
+
+	def __init__(self, shape: Tuple[int, int], dtype: Any, fill_value: Any = 0, chunk_size: int = 64):
+		self.shape = shape
+		self.dtype = np.dtype(dtype)
+		self.fill_value = fill_value
+		self.chunk_size = chunk_size
+		self.chunks: Dict[Tuple[int, int], np.ndarray] = {}
+
+	@property
+	def nbytes(self) -> int:
+		# memory held by allocated chunks
+		return sum(chunk.nbytes for chunk in self.chunks.values())
+
+	def to_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+		# the allocated chunks as an (n, 2) array of chunk keys and an (n, size, size) stack of their cells
+		keys = np.array(list(self.chunks), dtype=np.int32).reshape(-1, 2)
+		stack = np.empty( (len(keys), self.chunk_size, self.chunk_size), dtype=self.dtype )
+		for i, chunk in enumerate(self.chunks.values()):
+			stack[i] = chunk
+		return keys, stack
+
+	def load_arrays(self, keys: np.ndarray, stack: np.ndarray) -> None:
+		# replaces every chunk with the ones from to_arrays, as views into stack rather than copies
+		self.chunks = {(x, y): stack[i] for i, (x, y) in enumerate(keys.tolist())}
+
+	def _new_chunk(self) -> np.ndarray:
+		return np.full( (self.chunk_size, self.chunk_size), fill_value=self.fill_value, dtype=self.dtype, order="F" )
+
+	def _normalize(self, index: Any) -> Tuple[Index, Index]:
+		if not isinstance(index, tuple):
+			return index, slice(None)
+		return index
+
+	def _overlapping(self, x: slice, y: slice) -> Iterator[Tuple[Tuple[int, int], Tuple[slice, slice], Tuple[slice, slice]]]:
+		# yields (chunk key, slices within the chunk, slices within the region) for each chunk a region covers
+		size = self.chunk_size
+		x_start, x_stop, _ = x.indices(self.shape[0])
+		y_start, y_stop, _ = y.indices(self.shape[1])
+
+		for chunk_x in range(x_start // size, (x_stop - 1) // size + 1 if x_stop > x_start else 0):
+			low_x = max(x_start, chunk_x * size)
+			high_x = min(x_stop, (chunk_x + 1) * size)
+			for chunk_y in range(y_start // size, (y_stop - 1) // size + 1 if y_stop > y_start else 0):
+				low_y = max(y_start, chunk_y * size)
+				high_y = min(y_stop, (chunk_y + 1) * size)
+				yield (
+					(chunk_x, chunk_y),
+					(slice(low_x - chunk_x * size, high_x - chunk_x * size), slice(low_y - chunk_y * size, high_y - chunk_y * size)),
+					(slice(low_x - x_start, high_x - x_start), slice(low_y - y_start, high_y - y_start))
+				)
+
+	def region_shape(self, x: slice, y: slice) -> Tuple[int, int]:
+		x_start, x_stop, _ = x.indices(self.shape[0])
+		y_start, y_stop, _ = y.indices(self.shape[1])
+		return max(0, x_stop - x_start), max(0, y_stop - y_start)
+
+	def __getitem__(self, index: Any) -> Any:
+		x, y = self._normalize(index)
+
+		if isinstance(x, slice) and isinstance(y, slice):
+			out = np.full( self.region_shape(x, y), fill_value=self.fill_value, dtype=self.dtype, order="F" )
+			for key, chunk_slices, out_slices in self._overlapping(x, y):
+				chunk = self.chunks.get(key)
+				if chunk is not None:
+					out[out_slices] = chunk[chunk_slices]
+			return out
+
+		if isinstance(x, np.ndarray) or isinstance(y, np.ndarray):
+			return self._gather(np.asarray(x), np.asarray(y))
+
+		chunk = self.chunks.get((x // self.chunk_size, y // self.chunk_size))
+		if chunk is None:
+			return self.dtype.type(self.fill_value)
+		return chunk[x % self.chunk_size, y % self.chunk_size]
+
+	def _gather(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+		# reads scattered cells, one vectorized lookup per allocated chunk they fall in
+		out = np.full(xs.shape, fill_value=self.fill_value, dtype=self.dtype)
+		if not xs.size:
+			return out
+
+		size = self.chunk_size
+		chunk_xs, chunk_ys = xs // size, ys // size
+		for key in set(zip(chunk_xs.tolist(), chunk_ys.tolist())):
+			chunk = self.chunks.get(key)
+			if chunk is not None:
+				in_chunk = (chunk_xs == key[0]) & (chunk_ys == key[1])
+				out[in_chunk] = chunk[xs[in_chunk] % size, ys[in_chunk] % size]
+		return out
+
+	def __setitem__(self, index: Any, value: Any) -> None:
+		x, y = self._normalize(index)
+
+		if isinstance(x, slice) and isinstance(y, slice):
+			value = np.broadcast_to(np.asarray(value, dtype=self.dtype), self.region_shape(x, y))
+			for key, chunk_slices, value_slices in self._overlapping(x, y):
+				chunk = self.chunks.get(key)
+				if chunk is None:
+					part = value[value_slices]
+					if (part == self.fill_value).all():
+						continue # writing the fill value into an unallocated chunk changes nothing
+					chunk = self.chunks[key] = self._new_chunk()
+				chunk[chunk_slices] = value[value_slices]
+			return
+
+		key = (x // self.chunk_size, y // self.chunk_size)
+		chunk = self.chunks.get(key)
+		if chunk is None:
+			if value == self.fill_value:
+				return
+			chunk = self.chunks[key] = self._new_chunk()
+		chunk[x % self.chunk_size, y % self.chunk_size] = value
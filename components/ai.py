@@ -1,70 +1,104 @@
 from __future__ import annotations
 
-import random
-from typing import List, Optional, Tuple, TYPE_CHECKING
-import numpy as np
+from collections import deque
+import itertools
+from typing import Deque, List, Optional, Tuple, TYPE_CHECKING
 import tcod
 from actions import Action, BumpAction, MeleeAction, MovementAction, WaitAction
 
 if TYPE_CHECKING:
 	from entity import Actor
 
+# paths are searched within the box spanning both endpoints, padded by this many cells
+PATH_MARGIN = 64
+# how many upcoming steps of a cached path are checked for newly arrived blockers before reusing it
+PATH_LOOKAHEAD = 3
+# how many steps longer than when it was computed a patched path can get, relative to the distance
+# left to the target, before it's recomputed instead of followed the long way round
+PATH_SLACK = 0
+
+# the steps a confused actor stumbles in, one picked at random each turn
+CONFUSED_DIRECTIONS = [
+	(-1, -1),
+	(0, -1),
+	(1, -1),
+	(-1, 0),
+	(1, 0),
+	(-1, 1),
+	(0, 1),
+	(1, 1)
+]
+
 class BaseAI(Action):
+	__slots__ = ()
+
 	entity: Actor
 
-	def perform(self) -> None:
+	def get_action(self) -> Action:
+		# decide what the actor does this turn, for the scheduler to perform and charge the cost of
 		raise NotImplementedError()
 
+	def perform(self) -> None:
+		self.get_action().perform()
+
+	@property
+	def idle(self) -> bool:
+		# whether the actor has nothing in progress, so it can be left dormant while far from the player
+		return False
+
 	# Compute and return a path to the destination, or if invalid, return an empty list
 	def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
 
-		cost = np.array(self.entity.game_map.tiles["walkable"], dtype=np.int8)
-
-		for entity in self.entity.game_map.entities:
-			# penalizes paths blocked by other entities
-			if entity.blocks_movement and cost[entity.x, entity.y]:
-				cost[entity.x, entity.y] += 10
+		game_map = self.entity.game_map
+		region = game_map.bounding_region((self.entity.x, self.entity.y), (dest_x, dest_y), PATH_MARGIN)
+		origin_x, origin_y = region[0].start, region[1].start
+		cost = game_map.get_path_cost(region)
 
 		graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
 		pathfinder = tcod.path.Pathfinder(graph)
 
-		pathfinder.add_root((self.entity.x, self.entity.y))
+		pathfinder.add_root((self.entity.x - origin_x, self.entity.y - origin_y))
 
-		path: List[List[int]] = pathfinder.path_to((dest_x, dest_y))[1:].tolist()
+		path: List[List[int]] = pathfinder.path_to((dest_x - origin_x, dest_y - origin_y))[1:].tolist()
 
-		return [(index[0], index[1]) for index in path]
+		return [(index[0] + origin_x, index[1] + origin_y) for index in path]
 
 class ConfusedAI(BaseAI):
+	__slots__ = ("previous_ai", "ticks")
+
 	def __init__(self, entity: Actor, previous_ai: Optional[BaseAI], ticks: int):
 		super().__init__(entity)
 		self.previous_ai = previous_ai
 		self.ticks = ticks
 
-	def perform(self) -> None:
+	def get_action(self) -> Action:
 		if self.ticks <= 0:
 			self.engine.message_log.add_message(f"{self.entity.name.capitalize()} shakes it off.")
 			self.entity.ai = self.previous_ai
+			return WaitAction(self.entity)
 
 		else:
-			dx, dy = random.choice([
-				(-1, -1),
-				(0, -1),
-				(1, -1),
-				(-1, 0),
-				(1, 0),
-				(-1, 1),
-				(0, 1),
-				(1, 1)
-			])
+			dx, dy = CONFUSED_DIRECTIONS[self.engine.rng.get("ai").integers(len(CONFUSED_DIRECTIONS))]
 			self.ticks -= 1
-			return BumpAction(self.entity, dx, dy).perform()
+			return BumpAction(self.entity, dx, dy)
 
 class HostileAI(BaseAI):
+	__slots__ = ("path", "path_versions", "path_detour")
+
 	def __init__(self, entity: Actor):
 		super().__init__(entity)
-		self.path: List[Tuple[int, int]] = []
-
-	def perform(self) -> None:
+		self.path: Deque[Tuple[int, int]] = deque()
+		# the (tiles, blockers) versions the path was last computed or checked against
+		self.path_versions: Tuple[int, int] = (-1, -1)
+		# how many more steps the path took than the distance to its target, when it was computed
+		self.path_detour = 0
+
+	@property
+	def idle(self) -> bool:
+		# hostiles only act on sight of the player, or to finish walking a path
+		return not self.path
+
+	def get_action(self) -> Action:
 		target = self.engine.player
 		dx = target.x - self.entity.x
 		dy = target.y - self.entity.y
@@ -72,12 +106,52 @@ class HostileAI(BaseAI):
 
 		if self.engine.game_map.visible[self.entity.x,self.entity.y]:
 			if distance <= 1:
-				return MeleeAction(self.entity, dx, dy).perform()
+				return MeleeAction(self.entity, dx, dy)
 
-			self.path = self.get_path_to(target.x, target.y)
+			if not self.repair_path( (target.x, target.y) ):
+				# every hostile chasing the player shares one distance field per enemy phase
+				self.path = deque(self.engine.player_flow_field.path_from(self.entity.x, self.entity.y))
+				self.path_versions = (self.engine.game_map.tiles_version, self.engine.game_map.blockers_version)
+				self.path_detour = len(self.path) - distance
 
 		if self.path:
-			dest_x, dest_y = self.path.pop(0)
-			return MovementAction(self.entity, dest_x - self.entity.x, dest_y - self.entity.y).perform()
-
-		return WaitAction(self.entity).perform()
\ No newline at end of file
+			dest_x, dest_y = self.path.popleft()
+			return MovementAction(self.entity, dest_x - self.entity.x, dest_y - self.entity.y)
+
+		return WaitAction(self.entity)
+
+	def repair_path(self, target_xy: Tuple[int, int]) -> bool:
+		# keeps the cached path, which starts next to this actor and ends on the target it was computed for,
+		# patching its end when the target took a step, and returns False when it has to be recomputed instead
+		game_map = self.engine.game_map
+		path = self.path
+		if not path or self.path_versions[0] != game_map.tiles_version:
+			return False
+
+		next_x, next_y = path[0]
+		if max(abs(next_x - self.entity.x), abs(next_y - self.entity.y)) != 1:
+			return False # the last step along it didn't happen
+
+		if target_xy != path[-1]:
+			if len(path) >= 2 and target_xy == path[-2]:
+				path.pop()
+			elif len(path) >= 2 and max(abs(target_xy[0] - path[-2][0]), abs(target_xy[1] - path[-2][1])) == 1:
+				path[-1] = target_xy # a step to the side of the path's approach
+			elif max(abs(target_xy[0] - path[-1][0]), abs(target_xy[1] - path[-1][1])) == 1:
+				path.append(target_xy)
+			else:
+				return False
+
+			# trailing the target's footsteps can lead well round the direct route, so fall back to a fresh path
+			distance = max(abs(target_xy[0] - self.entity.x), abs(target_xy[1] - self.entity.y))
+			if len(path) - distance > self.path_detour + PATH_SLACK:
+				return False
+
+		if self.path_versions[1] != game_map.blockers_version:
+			# something blocking moved since the last check, so make sure it isn't standing in the way
+			for step in itertools.islice(path, PATH_LOOKAHEAD):
+				if step != target_xy and game_map.blockers[step]:
+					return False
+			self.path_versions = (game_map.tiles_version, game_map.blockers_version)
+
+		return True
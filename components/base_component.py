@@ -8,6 +8,8 @@ if TYPE_CHECKING:
 	from game_map import GameMap
 
 class BaseComponent:
+	__slots__ = ("parent",)
+
 	parent: Entity # owning entity instance
 
 	@property
@@ -12,7 +12,13 @@ from input_handlers import SingleTargetHandler, AreaTargetHandler
 if TYPE_CHECKING:
 	from entity import Actor, Item
 
+# how far away loud items wake up sleeping actors
+EXPLOSION_HEARING_RADIUS = 24
+GUNSHOT_HEARING_RADIUS = 24
+
 class Consumable(BaseComponent):
+	__slots__ = ()
+
 	parent: Item
 
 	def get_action(self, consumer: Actor) -> Optional[actions.Action]:
@@ -29,6 +35,8 @@ class Consumable(BaseComponent):
 			inventory.items.remove(item)
 
 class HealingConsumable(Consumable):
+	__slots__ = ("amount",)
+
 	def __init__(self, amount: int):
 		self.amount = amount
 
@@ -43,6 +51,8 @@ class HealingConsumable(Consumable):
 			raise Impossible(f"Edwards doesn't have the kind of wounds that will heal.")
 
 class ConfusionConsumable(Consumable):
+	__slots__ = ("ticks",)
+
 	def __init__(self, ticks: int):
 		self.ticks = ticks
 
@@ -66,6 +76,8 @@ class ConfusionConsumable(Consumable):
 		self.consume()
 
 class ExplosionDamageConsumable(Consumable):
+	__slots__ = ("damage", "radius")
+
 	def __init__(self, damage: int, radius: int):
 		self.damage = damage
 		self.radius = radius
@@ -85,41 +97,34 @@ class ExplosionDamageConsumable(Consumable):
 		if not self.engine.game_map.visible[target_xy]:
 			raise Impossible("Best not to use that blindly...")
 
-		targets_hit = False
+		targets = self.engine.game_map.get_actors_within_radius(*target_xy, self.radius)
 
-		for actor in self.engine.game_map.actors:
-			if actor.distance(*target_xy) <= self.radius:
-				self.engine.message_log.add_message(f"The blast catches {actor.name}, dealing {self.damage} damage.")
-				actor.fighter.take_damage(self.damage)
-				targets_hit = True
+		for actor in targets:
+			self.engine.message_log.add_message(f"The blast catches {actor.name}, dealing {self.damage} damage.")
+			actor.fighter.take_damage(self.damage)
 
-		if not targets_hit:
+		if not targets:
 			self.engine.message_log.add_message("The explosion booms in the cramped space, but no one is hurt.")
+		self.engine.scheduler.make_noise(*target_xy, EXPLOSION_HEARING_RADIUS)
 		self.consume()
 
 
 class BallisticDamageConsumable(Consumable):
+	__slots__ = ("damage", "max_range")
+
 	def __init__(self, damage: int, max_range: int):
 		self.damage = damage
 		self.max_range = max_range
 
 	def activate(self, action: actions.ItemAction) -> None:
 		consumer = action.entity
-		target = None
-		closest_distance = self.max_range + 1.0
-
-		for actor in self.engine.game_map.actors:
-			if actor is not consumer and self.parent.game_map.visible[actor.x, actor.y]:
-				distance = consumer.distance(actor.x, actor.y)
-
-				if distance < closest_distance:
-					target = actor
-					closest_distance = distance
+		target = self.engine.game_map.get_nearest_visible_actor(consumer.x, consumer.y, self.max_range + 1.0, exclude = consumer)
 
 		if target:
 			self.engine.message_log.add_message(f"{consumer.name.capitalize()} shoots {target.name}, dealing {self.damage} damage.")
 
 			target.fighter.take_damage(self.damage)
+			self.engine.scheduler.make_noise(consumer.x, consumer.y, GUNSHOT_HEARING_RADIUS)
 			self.consume()
 		else:
 			raise Impossible(f"Edwards raises the weapon, but no target presents itself.")
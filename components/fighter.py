@@ -9,6 +9,8 @@ if TYPE_CHECKING:
 	from entity import Actor
 
 class Fighter(BaseComponent):
+	__slots__ = ("max_hp", "_hp", "defense", "power")
+
 	parent: Actor
 
 	def __init__(self, hp: int, defense: int, power: int):
@@ -24,6 +26,9 @@ class Fighter(BaseComponent):
 	@hp.setter
 	def hp(self, value: int) -> None:
 		self._hp = max(0, min(value, self.max_hp))
+		actor_store = self.game_map.actor_store
+		if actor_store is not None and self.parent in actor_store.slots:
+			actor_store.update(self.parent)
 		if self._hp == 0 and self.parent.ai:
 			self.die()
 
@@ -49,12 +54,21 @@ class Fighter(BaseComponent):
 			death_message = f"{self.parent.name.capitalize()} slumps over dead."
 			death_message_color = color.enemy_die
 
-		self.parent.char = "%"
-		self.parent.color = (191, 0, 0)
-		self.parent.blocks_movement = False
+		corpse_name = f"the corpse of {self.parent.name}"
 		self.parent.ai = None
-		self.parent.name = f"the corpse of {self.parent.name}"
-		self.parent.render_order = RenderOrder.CORPSE	
+
+		if self.engine.player is self.parent:
+			# the player's body stays an entity, since the engine keeps referring to it
+			self.parent.char = "%"
+			self.parent.color = (191, 0, 0)
+			self.parent.blocks_movement = False
+			self.parent.name = corpse_name
+			self.parent.render_order = RenderOrder.CORPSE
+			self.game_map.reindex_entity(self.parent)
+		else:
+			# everyone else leaves the entity set and is drawn from the map's decal layer
+			self.game_map.remove_entity(self.parent)
+			self.game_map.add_decal(self.parent.x, self.parent.y, "%", (191, 0, 0), corpse_name)
 
 		self.engine.message_log.add_message(death_message, death_message_color)
 	
\ No newline at end of file
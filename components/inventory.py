@@ -6,6 +6,8 @@ if TYPE_CHECKING:
 	from entity import Actor, Item
 
 class Inventory(BaseComponent):
+	__slots__ = ("capacity", "items")
+
 	parent: actor
 
 	def __init__(self, capacity: int):
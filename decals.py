@@ -0,0 +1,38 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:
+	from game_map import MapArray
+
+class DecalLayer:
+	# Static marks left on the floor, such as corpses, kept out of the entity set.
+	# Each cell holds a decal ID (0 for none) indexing a table of distinct glyph, color and name
+	# combinations, so thousands of corpses cost two bytes a cell and a handful of table rows.
+
+	def __init__(self, cells: MapArray):
+		self.cells = cells
+		self.names: List[Optional[str]] = [None]
+		self.chars = np.zeros(1, dtype=np.int32)
+		self.colors = np.zeros( (1, 3), dtype=np.uint8 )
+		self._ids: Dict[Tuple[str, Tuple[int, int, int], str], int] = {}
+		self.count = 0 # decals placed, including ones later covered over
+
+	def intern(self, char: str, color: Tuple[int, int, int], name: str) -> int:
+		# the ID of a glyph, color and name combination, added to the table on first use
+		key = (char, color, name)
+		decal_id = self._ids.get(key)
+		if decal_id is None:
+			decal_id = self._ids[key] = len(self.names)
+			self.names.append(name)
+			self.chars = np.append(self.chars, np.int32(ord(char)))
+			self.colors = np.vstack( (self.colors, np.array(color, dtype=np.uint8)) )
+		return decal_id
+
+	def add(self, x: int, y: int, char: str, color: Tuple[int, int, int], name: str) -> None:
+		# a newer decal covers whatever was on the cell before
+		self.cells[x, y] = self.intern(char, color, name)
+		self.count += 1
+
+	def name_at(self, x: int, y: int) -> Optional[str]:
+		return self.names[self.cells[x, y]]
@@ -1,47 +1,102 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import Optional, Tuple, TYPE_CHECKING
+import numpy as np
 from tcod.console import Console
 from tcod.map import compute_fov
-import exceptions
+from camera import Camera
+from actions import ACTION_COST
+from flow_field import FlowField
 from input_handlers import MainGameEventHandler
 from message_log import MessageLog
 from render_functions import render_bar, render_names_at_mouse_location
+from rng import RandomStreams
+from scheduler import TurnScheduler
 
 if TYPE_CHECKING:
+	from action_log import ActionRecorder
 	from entity import Actor
 	from game_map import GameMap
 	from input_handlers import EventHandler
+	from profiler import Profiler
+
+FOV_RADIUS = 8
+# hostiles only chase what they can see, so the shared flow field is bounded to this far around the player
+FLOW_FIELD_RADIUS = 64
 
 class Engine:
 
 	game_map: GameMap
 
-	def __init__(self, player: Actor):
+	def __init__(self, player: Actor, rng: Optional[RandomStreams] = None):
 		self.event_handler: EventHandler = MainGameEventHandler(self)
 		self.message_log = MessageLog()
 		self.mouse_location = (0,0)
+		# the map is drawn in the console's top 64 rows, following the player
+		self.camera = Camera(width = 64, height = 64)
 		self.player = player
+		# seeded random streams for generation and ai, see rng.py
+		self.rng = rng if rng is not None else RandomStreams()
+		# when set, every player action is appended to it before being performed
+		self.action_log: Optional[ActionRecorder] = None
+		# when set, times each phase of a turn and frame, see profiler.py
+		self.profiler: Optional[Profiler] = None
+		self.scheduler = TurnScheduler(self)
+		self._player_flow_field: Optional[FlowField] = None
+		# map, window, player position and window transparency the current fov was computed from
+		self._fov_state: Optional[Tuple[GameMap, Tuple[slice, slice], int, int, np.ndarray]] = None
+
+	@property
+	def player_flow_field(self) -> FlowField:
+		# built on first use and reused by every hostile for the rest of the enemy phase
+		if self._player_flow_field is None:
+			root = (self.player.x, self.player.y)
+			region = self.game_map.bounding_region(root, root, FLOW_FIELD_RADIUS)
+			self._player_flow_field = FlowField(
+				self.game_map.get_path_cost(region), root, (region[0].start, region[1].start)
+			)
+		return self._player_flow_field
 
-	def handle_enemy_turns(self) -> None:
-		for entity in set(self.game_map.actors) - {self.player}:
-			if entity.ai:
-				try:
-					entity.ai.perform()
-				except exceptions.Impossible:
-					pass # ignore impossible actions from enemy ai
+	def handle_enemy_turns(self, player_cost: int = ACTION_COST) -> None:
+		# every actor whose turn comes up while the player spends player_cost acts
+		self._player_flow_field = None
+		self.scheduler.advance(player_cost)
 
 	def update_fov(self) -> None:
-		self.game_map.visible[:] = compute_fov(
-			self.game_map.tiles["transparent"],
-			(self.player.x, self.player.y),
+		# only the window within FOV_RADIUS of the player can change, so fov is computed and written there alone
+		game_map = self.game_map
+		x, y = self.player.x, self.player.y
+		window = (
+			slice(max(0, x - FOV_RADIUS), x + FOV_RADIUS + 1),
+			slice(max(0, y - FOV_RADIUS), y + FOV_RADIUS + 1)
+		)
+		transparent = game_map.get_transparent(window)
+
+		if self._fov_state is not None:
+			last_map, last_window, last_x, last_y, last_transparent = self._fov_state
+			if last_map is game_map:
+				if (last_x, last_y) == (x, y) and np.array_equal(last_transparent, transparent):
+					return # nothing that could change the fov has moved
+				game_map.visible[last_window] = False
+				game_map.mark_dirty(last_window)
+			else:
+				game_map.visible[:] = False
+				game_map.mark_dirty()
+
+		game_map.visible[window] = compute_fov(
+			transparent,
+			(x - window[0].start, y - window[1].start),
 			algorithm = 13,
-			radius = 8
+			radius = FOV_RADIUS
 		)
-		self.game_map.explored |= self.game_map.visible
+		game_map.explored[window] |= game_map.visible[window]
+		game_map.mark_dirty(window)
+
+		self._fov_state = (game_map, window, x, y, transparent)
 
 	def render(self, console: Console) -> None:
-		self.game_map.render(console)
+		self.camera.center_on(self.player.x, self.player.y, self.game_map.width, self.game_map.height)
+		self.game_map.render(console, self.camera)
 
 		self.message_log.render(console = console, x = 8, y = 65, width = 48, height = 6)
 
@@ -1,7 +1,6 @@
 from __future__ import annotations
-import copy
 import math
-from typing import Optional, Tuple, Type, TypeVar, TYPE_CHECKING, Union
+from typing import Optional, Tuple, Type, TYPE_CHECKING, Union
 from render_order import RenderOrder
 
 if TYPE_CHECKING:
@@ -11,9 +10,11 @@ if TYPE_CHECKING:
 	from components.inventory import Inventory
 	from game_map import GameMap
 
-T = TypeVar("T", bound="Entity")
+# an actor of this speed spends exactly an action's cost on each action
+NORMAL_SPEED = 100
 
 class Entity:
+	__slots__ = ("parent", "x", "y", "char", "color", "name", "blocks_movement", "render_order")
 
 	parent: Union[GameMap, Inventory]
 
@@ -37,30 +38,27 @@ class Entity:
 		self.render_order = render_order
 		if parent:
 			self.parent = parent
-			parent.entities.add(self)
+			parent.add_entity(self)
 
 	@property
 	def game_map(self):
 		return self.parent.game_map
 	
 
-	def spawn(self: T, game_map: GameMap, x: int, y: int) -> T:
-		clone = copy.deepcopy(self)
-		clone.x = x
-		clone.y = y
-		clone.parent = game_map
-		game_map.entities.add(clone)
-		return clone
-
 	def place(self, x: int, y: int, game_map: Optional[GameMap] = None) -> None:
-		self.x = x
-		self.y = y
+		on_map = hasattr(self, "parent") and self.parent is self.game_map
 		if game_map:
-			if hasattr(self, "parent"):
-				if self.parent is self.game_map:
-					self.game_map.entities.remove(self)
+			if on_map:
+				self.game_map.remove_entity(self)
+			self.x = x
+			self.y = y
 			self.parent = game_map
-			game_map.entities.add(self)
+			game_map.add_entity(self)
+		else:
+			self.x = x
+			self.y = y
+			if on_map:
+				self.game_map.reindex_entity(self)
 
 	def distance(self, x: int, y: int) -> float:
 		return math.sqrt( ((x - self.x) ** 2) + ((y - self.y) ** 2) )
@@ -68,9 +66,12 @@ class Entity:
 	def move(self, dx: int, dy: int) -> None:
 		self.x += dx
 		self.y += dy
+		self.game_map.reindex_entity(self)
 
 
 class Actor(Entity):
+	__slots__ = ("ai", "fighter", "inventory", "speed")
+
 	def __init__(
 		self,
 		*,
@@ -81,7 +82,8 @@ class Actor(Entity):
 		name: str = "<Unnamed>",
 		ai_cls: Type[BaseAI],
 		fighter: Fighter,
-		inventory: Inventory
+		inventory: Inventory,
+		speed: int = NORMAL_SPEED
 	):
 		super().__init__(
 			x=x,
@@ -100,11 +102,15 @@ class Actor(Entity):
 		self.inventory = inventory
 		self.inventory.parent = self
 
+		self.speed = speed
+
 	@property
 	def is_alive(self) -> bool:
 		return bool(self.ai)
 	
 class Item(Entity):
+	__slots__ = ("consumable",)
+
 	def __init__(
 		self,
 		*,
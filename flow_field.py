@@ -0,0 +1,28 @@
+from __future__ import annotations
+from typing import List, Tuple
+import numpy as np
+import tcod
+
+class FlowField:
+	# A distance field rooted at a single destination, shared by every actor heading there.
+	# The field is resolved lazily, so it only expands as far as the furthest actor that asks for a path.
+	# The cost array may cover just a region of the map, whose top-left cell is given as origin.
+
+	def __init__(self, cost: np.ndarray, root: Tuple[int, int], origin: Tuple[int, int] = (0, 0)):
+		self.root = root
+		self.origin = origin
+		self.shape = cost.shape
+		graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
+		self.pathfinder = tcod.path.Pathfinder(graph)
+		self.pathfinder.add_root((root[0] - origin[0], root[1] - origin[1]))
+
+	# Return the path from the given point to the root, excluding the starting point
+	# Points outside the field's region have no path
+	def path_from(self, x: int, y: int) -> List[Tuple[int, int]]:
+		origin_x, origin_y = self.origin
+		if not (0 <= x - origin_x < self.shape[0] and 0 <= y - origin_y < self.shape[1]):
+			return []
+
+		path: List[List[int]] = self.pathfinder.path_from((x - origin_x, y - origin_y))[1:].tolist()
+
+		return [(index[0] + origin_x, index[1] + origin_y) for index in path]
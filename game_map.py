@@ -1,78 +1,325 @@
 from __future__ import annotations
-from typing import Iterable, Iterator, Optional, TYPE_CHECKING
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union, TYPE_CHECKING
 import numpy as np
 from tcod.console import Console
+from actor_store import ActorStore
+from chunked_array import ChunkedArray
+from decals import DecalLayer
 from entity import Actor, Item
+from render_order import RenderOrder
 import tile_types
 
 if TYPE_CHECKING:
+	from camera import Camera
 	from engine import Engine
 	from entity import Entity
 
+ALL_CELLS = (slice(None), slice(None))
+
+# past this many pending regions the whole map is recomposited instead
+MAX_DIRTY_REGIONS = 64
+
+# a per-cell layer of the map, either one dense array or lazily allocated chunks
+MapArray = Union[np.ndarray, ChunkedArray]
+
 class GameMap:
-	def __init__(self, engine: Engine, width: int, height: int, entities: Iterable[Entity] = ()):
+	def __init__(
+		self,
+		engine: Engine,
+		width: int,
+		height: int,
+		entities: Iterable[Entity] = (),
+		use_actor_store: bool = True,
+		chunk_size: Optional[int] = None
+	):
 		self.engine = engine
 		self.width = width
 		self.height = height
-		self.entities = set(entities)
-		self.tiles = np.full( (width, height), fill_value=tile_types.wall, order="F" )
+		# with a chunk_size, every layer below is stored in chunks allocated on first write,
+		# so huge maps only pay for the parts that were carved, explored or stood on
+		self.chunk_size = chunk_size
+		# tile IDs, indexing tile_types.tile_table
+		self.tiles = self.new_layer(np.uint8, tile_types.wall)
+
+		self.visible = self.new_layer(bool, False)
+		self.explored = self.new_layer(bool, False)
+		# corpses and other static marks, drawn with the map layer on visible cells
+		self.decals = DecalLayer(self.new_layer(np.uint16, 0))
+
+		# composited map layer for the last viewport drawn, only recomposited in regions marked dirty
+		self._view: Optional[np.ndarray] = None
+		self._view_region: Tuple[slice, slice] = ALL_CELLS
+		self._dirty_regions: List[Tuple[slice, slice]] = [ALL_CELLS]
+
+		# spatial index, kept in sync through add_entity, remove_entity and reindex_entity
+		# occupancy and blockers count the entities (and blocking entities) standing on each cell
+		self.entities: Set[Entity] = set()
+		self.occupancy = self.new_layer(np.int16, 0)
+		self.blockers = self.new_layer(np.int16, 0)
+		self.entity_cells: Dict[Tuple[int, int], List[Entity]] = {}
+		self._indexed: Dict[Entity, Tuple[int, int, bool, RenderOrder]] = {}
+		self._actors: Set[Actor] = set()
+		self._items: Set[Item] = set()
+		# bumped whenever terrain or a blocking entity changes, so cached paths and cost grids know they are stale
+		self.tiles_version = 0
+		self.blockers_version = 0
+		self._path_cost: Optional[Tuple[Tuple[slice, slice], Tuple[int, int], np.ndarray]] = None
+		# optional column store of actor positions and stats, for vectorized area and targeting queries
+		self.actor_store: Optional[ActorStore] = ActorStore() if use_actor_store else None
 
-		self.visible = np.full( (width, height), fill_value=False, order="F" )
-		self.explored = np.full( (width, height), fill_value=False, order="F" )
+		# entities bucketed by render order, each with cached coordinate/glyph/color arrays for drawing
+		self._render_buckets: Dict[RenderOrder, Set[Entity]] = {
+			order: set() for order in sorted(RenderOrder, key=lambda order: order.value)
+		}
+		self._render_batches: Dict[RenderOrder, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+
+		for entity in entities:
+			self.add_entity(entity)
 
 	@property
 	def game_map(self) -> GameMap:
 		return self
 
+	def new_layer(self, dtype: Any, fill_value: Any) -> MapArray:
+		# a map-sized array in this map's storage layout, read and written by (x, y), slices or coordinate arrays
+		if self.chunk_size is not None:
+			return ChunkedArray( (self.width, self.height), dtype, fill_value, self.chunk_size )
+		return np.full( (self.width, self.height), fill_value=fill_value, dtype=dtype, order="F" )
+
 	@property
 	def actors(self) -> Iterator[Actor]:
-		yield from (
-			entity
-			for entity in self.entities
-			if isinstance(entity, Actor) and entity.is_alive
-		)
+		yield from (actor for actor in self._actors if actor.is_alive)
 
 	@property
 	def items(self) -> Iterator[Item]:
-		yield from (
-			entity
-			for entity in self.entities
-			if isinstance(entity, Item)
-		)
+		yield from self._items
+
+	def add_entity(self, entity: Entity) -> None:
+		# adding an entity that is already on the map re-indexes it at its current location
+		if entity in self._indexed:
+			self.reindex_entity(entity)
+			return
+
+		self.entities.add(entity)
+		if isinstance(entity, Actor):
+			self._actors.add(entity)
+			if self.actor_store is not None:
+				self.actor_store.add(entity)
+		elif isinstance(entity, Item):
+			self._items.add(entity)
+		self._index(entity)
+
+	def remove_entity(self, entity: Entity) -> None:
+		self._unindex(entity)
+		self.entities.remove(entity)
+		if entity in self._actors:
+			self._actors.remove(entity)
+			if self.actor_store is not None:
+				self.actor_store.remove(entity)
+		self._items.discard(entity)
+
+	def reindex_entity(self, entity: Entity) -> None:
+		# call after changing an entity's position, blocks_movement, render_order, char or color directly
+		self._unindex(entity)
+		self._index(entity)
+		if self.actor_store is not None and entity in self._actors:
+			self.actor_store.update(entity)
+
+	def _index(self, entity: Entity) -> None:
+		x, y, blocks, render_order = entity.x, entity.y, entity.blocks_movement, entity.render_order
+		self._indexed[entity] = x, y, blocks, render_order
+		self._render_buckets[render_order].add(entity)
+		self._render_batches.pop(render_order, None)
+		self.entity_cells.setdefault((x, y), []).append(entity)
+		self.occupancy[x, y] += 1
+		if blocks:
+			self.blockers[x, y] += 1
+			self.blockers_version += 1
+
+	def _unindex(self, entity: Entity) -> None:
+		x, y, blocks, render_order = self._indexed.pop(entity)
+		self._render_buckets[render_order].remove(entity)
+		self._render_batches.pop(render_order, None)
+		cell = self.entity_cells[x, y]
+		cell.remove(entity)
+		if not cell:
+			del self.entity_cells[x, y]
+		self.occupancy[x, y] -= 1
+		if blocks:
+			self.blockers[x, y] -= 1
+			self.blockers_version += 1
+
+	def add_decal(self, x: int, y: int, char: str, color: Tuple[int, int, int], name: str) -> None:
+		self.decals.add(x, y, char, color, name)
+		self.mark_dirty( (slice(x, x + 1), slice(y, y + 1)) )
+
+	def get_entities_at_location(self, x: int, y: int) -> Sequence[Entity]:
+		return self.entity_cells.get((x, y), ())
 
 	def get_blocking_entity_at_location(self, location_x: int, location_y: int) -> Optional[Entity]:
-		for entity in self.entities:
-			if entity.blocks_movement and entity.x == location_x and entity.y == location_y:
+		if not self.in_bounds(location_x, location_y) or not self.blockers[location_x, location_y]:
+			return None
+
+		for entity in self.entity_cells[location_x, location_y]:
+			if entity.blocks_movement:
 				return entity
 
 		return None
 
 	def get_actor_at_location(self, x: int, y: int) -> Optional[Actor]:
-		for actor in self.actors:
-			if actor.x == x and actor.y == y:
-				return actor
-				
+		for entity in self.get_entities_at_location(x, y):
+			if isinstance(entity, Actor) and entity.is_alive:
+				return entity
+
 		return None
 
+	def get_actors_within_radius(self, x: int, y: int, radius: float) -> List[Actor]:
+		if self.actor_store is not None:
+			return self.actor_store.within_radius(x, y, radius)
+		return [actor for actor in self.actors if actor.distance(x, y) <= radius]
+
+	def get_actors_within_steps(self, x: int, y: int, steps: int) -> List[Actor]:
+		# chebyshev distance, the number of moves it takes to get there
+		if self.actor_store is not None:
+			return self.actor_store.within_steps(x, y, steps)
+		return [actor for actor in self.actors if max(abs(actor.x - x), abs(actor.y - y)) <= steps]
+
+	def get_staggered_actors(self, turn: int, interval: int) -> List[Actor]:
+		# a share of the living actors, such that each one comes up once every interval turns
+		if self.actor_store is not None:
+			return self.actor_store.staggered(turn, interval)
+		return [actor for i, actor in enumerate(self.actors) if i % interval == turn % interval]
+
+	def get_nearest_visible_actor(self, x: int, y: int, max_distance: float, exclude: Optional[Actor] = None) -> Optional[Actor]:
+		# the closest actor on a visible cell strictly nearer than max_distance
+		if self.actor_store is not None:
+			return self.actor_store.nearest_visible(x, y, self.visible, max_distance, exclude)
+
+		target = None
+		closest_distance = max_distance
+		for actor in self.actors:
+			if actor is not exclude and self.visible[actor.x, actor.y]:
+				distance = actor.distance(x, y)
+
+				if distance < closest_distance:
+					target = actor
+					closest_distance = distance
+		return target
+
+	# tile properties are gathered from the tile table, for the whole map or just a region of it
+	def get_walkable(self, region: Tuple[slice, slice] = ALL_CELLS) -> np.ndarray:
+		return tile_types.tile_table["walkable"][self.tiles[region]]
+
+	def get_transparent(self, region: Tuple[slice, slice] = ALL_CELLS) -> np.ndarray:
+		return tile_types.tile_table["transparent"][self.tiles[region]]
+
+	def get_path_cost(self, region: Tuple[slice, slice] = ALL_CELLS) -> np.ndarray:
+		# movement cost array for pathfinding, walls are impassable
+		# the last one built is reused until a tile or blocker changes, so the result is read-only
+		versions = (self.tiles_version, self.blockers_version)
+		if self._path_cost is not None and self._path_cost[0] == region and self._path_cost[1] == versions:
+			return self._path_cost[2]
+
+		cost = self.get_walkable(region).astype(np.int8)
+
+		# penalizes paths blocked by other entities
+		cost[(cost > 0) & (self.blockers[region] > 0)] += 10
+		cost.flags.writeable = False
+		self._path_cost = (region, versions, cost)
+		return cost
+
+	def bounding_region(self, start: Tuple[int, int], end: Tuple[int, int], margin: int) -> Tuple[slice, slice]:
+		# the box spanning two cells, padded by margin on every side and clipped to the map
+		return (
+			slice(max(0, min(start[0], end[0]) - margin), min(self.width, max(start[0], end[0]) + margin + 1)),
+			slice(max(0, min(start[1], end[1]) - margin), min(self.height, max(start[1], end[1]) + margin + 1))
+		)
+
 	def in_bounds(self, x: int, y: int) -> bool:
 		return 0 <= x < self.width and 0 <= y < self.height
 
+	def mark_tiles_changed(self, region: Tuple[slice, slice] = ALL_CELLS) -> None:
+		# call after changing tiles once the map is in play, so paths and cost grids over them are rebuilt
+		self.tiles_version += 1
+		self.mark_dirty(region)
+
+	def mark_dirty(self, region: Tuple[slice, slice] = ALL_CELLS) -> None:
+		# call after changing tiles, visible or explored so render recomposites that region
+		if len(self._dirty_regions) >= MAX_DIRTY_REGIONS:
+			self._dirty_regions = [ALL_CELLS]
+		elif self._dirty_regions != [ALL_CELLS]:
+			self._dirty_regions.append(region)
+
 	"""
 	If a tile is in "visible", draw it with "light" styling
 	Else if a tile is in "explored", draw it with "dark" styling
 	Else draw it as "SHROUD"
 	"""
-	def render(self, console: Console) -> None:
-		console.rgb[0:self.width, 0:self.height] = np.select(
-			condlist = [self.visible, self.explored],
-			choicelist = [self.tiles["light"], self.tiles["dark"]],
-			default = tile_types.SHROUD
-		)
+	def render(self, console: Console, camera: Camera) -> None:
+		# only the cells under the camera are composited, so cost is bounded by the screen, not the map
+		view = camera.region(self.width, self.height)
+		x0, x1 = view[0].start, view[0].stop
+		y0, y1 = view[1].start, view[1].stop
 
-		entities_sorted_for_rendering = sorted(
-			self.entities, key=lambda x: x.render_order.value
-		)
+		if self._view is None or view != self._view_region:
+			self._view = np.empty( (x1 - x0, y1 - y0), dtype=tile_types.graphic_dt, order="F" )
+			self._view_region = view
+			self._dirty_regions = [ALL_CELLS]
+
+		for region in self._dirty_regions:
+			clipped = self._clip_to_view(region)
+			if clipped is None:
+				continue
+			map_region, view_region = clipped
+			visible = self.visible[map_region]
+			state = np.where(visible, 2, self.explored[map_region])
+			view_cells = self._view[view_region]
+			view_cells[...] = tile_types.tile_graphics[self.tiles[map_region], state]
+
+			if self.decals.count:
+				decal_ids = self.decals.cells[map_region]
+				shown = visible & (decal_ids > 0)
+				view_cells["ch"][shown] = self.decals.chars[decal_ids[shown]]
+				view_cells["fg"][shown] = self.decals.colors[decal_ids[shown]]
+		self._dirty_regions = []
+
+		console.rgb[0:x1 - x0, 0:y1 - y0] = self._view
+
+		# later buckets are drawn over earlier ones
+		for render_order, entities in self._render_buckets.items():
+			if not entities:
+				continue
+
+			xs, ys, chars, colors = self._get_render_batch(render_order)
+			shown = (xs >= x0) & (xs < x1) & (ys >= y0) & (ys < y1)
+			shown[shown] = self.visible[xs[shown], ys[shown]]
+			console.rgb["ch"][xs[shown] - x0, ys[shown] - y0] = chars[shown]
+			console.rgb["fg"][xs[shown] - x0, ys[shown] - y0] = colors[shown]
+
+	def _clip_to_view(self, region: Tuple[slice, slice]) -> Optional[Tuple[Tuple[slice, slice], Tuple[slice, slice]]]:
+		# the part of a map region inside the cached view, as map slices and view slices
+		map_slices = []
+		view_slices = []
+		for axis, size, view_axis in zip(region, (self.width, self.height), self._view_region):
+			start, stop, _ = axis.indices(size)
+			start, stop = max(start, view_axis.start), min(stop, view_axis.stop)
+			if start >= stop:
+				return None
+			map_slices.append(slice(start, stop))
+			view_slices.append(slice(start - view_axis.start, stop - view_axis.start))
+		return (map_slices[0], map_slices[1]), (view_slices[0], view_slices[1])
 
-		for entity in entities_sorted_for_rendering:
-			if self.visible[entity.x, entity.y]:
-				console.print(entity.x, entity.y, entity.char, fg=entity.color)
\ No newline at end of file
+	def _get_render_batch(self, render_order: RenderOrder) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+		# rebuilt only after an entity in the bucket was added, removed or re-indexed
+		batch = self._render_batches.get(render_order)
+		if batch is None:
+			entities = self._render_buckets[render_order]
+			count = len(entities)
+			batch = (
+				np.fromiter((entity.x for entity in entities), dtype=np.intp, count=count),
+				np.fromiter((entity.y for entity in entities), dtype=np.intp, count=count),
+				np.fromiter((ord(entity.char) for entity in entities), dtype=np.int32, count=count),
+				np.array([entity.color for entity in entities], dtype=np.uint8).reshape(count, 3)
+			)
+			self._render_batches[render_order] = batch
+		return batch
\ No newline at end of file
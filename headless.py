@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# Runs the game without a window, driving the player from a policy instead of tcod.event.wait()
+# Useful for measuring throughput and batch simulation on machines with no display
+from __future__ import annotations
+import argparse
+import itertools
+import os
+import random
+import time
+from typing import Callable, Iterable, NamedTuple, Optional, Sequence, Tuple, TYPE_CHECKING
+import tcod
+
+from action_log import ActionRecorder, LoggedActionPolicy, read_header, read_records
+from actions import Action, BumpAction, PickupAction, WaitAction
+from profiler import PHASES, Profiler
+from save_game import load_game, save_game
+from setup_game import new_game
+
+if TYPE_CHECKING:
+	from engine import Engine
+
+# a policy picks the player's next action, returning None if the step should not act,
+# and raising StopIteration once it has nothing left to play
+Policy = Callable[["Engine"], Optional[Action]]
+
+DIRECTIONS = [
+	(-1, -1), (0, -1), (1, -1),
+	(-1, 0), (1, 0),
+	(-1, 1), (0, 1), (1, 1)
+]
+
+class RandomPolicy:
+	# wanders, occasionally waiting or grabbing at the floor
+	def __init__(self, seed: Optional[int] = None):
+		self.random = random.Random(seed)
+
+	def __call__(self, engine: Engine) -> Optional[Action]:
+		player = engine.player
+		roll = self.random.random()
+
+		if roll < 0.05:
+			return WaitAction(player)
+		if roll < 0.1:
+			return PickupAction(player)
+
+		dx, dy = self.random.choice(DIRECTIONS)
+		return BumpAction(player, dx, dy)
+
+class ScriptedPolicy:
+	# plays a fixed list of (dx, dy) bumps, where None means wait, looping when it runs out
+	def __init__(self, moves: Sequence[Optional[Tuple[int, int]]]):
+		self.moves = itertools.cycle(moves)
+
+	def __call__(self, engine: Engine) -> Optional[Action]:
+		move = next(self.moves)
+
+		if move is None:
+			return WaitAction(engine.player)
+		return BumpAction(engine.player, *move)
+
+class ReplayPolicy:
+	# feeds recorded key presses through the active event handler, the way main's event loop does
+	def __init__(self, keys: Iterable[int]):
+		self.keys = iter(keys)
+
+	def __call__(self, engine: Engine) -> Optional[Action]:
+		event = tcod.event.KeyDown(scancode = 0, sym = next(self.keys), mod = 0)
+		return engine.event_handler.dispatch(event)
+
+class SimulationResult(NamedTuple):
+	steps: int
+	turns: int
+	seconds: float
+	player_alive: bool
+
+	@property
+	def turns_per_second(self) -> float:
+		return self.turns / self.seconds if self.seconds else 0.0
+
+def run(
+	engine: Engine,
+	policy: Policy,
+	max_turns: int,
+	max_steps: Optional[int] = None,
+	render: bool = False
+) -> SimulationResult:
+	# steps until max_turns turns have passed, the player dies or the policy runs dry
+	console = tcod.console.Console(64, 72, order="F") if render else None
+	steps = turns = 0
+	start = time.perf_counter()
+
+	while turns < max_turns and engine.player.is_alive:
+		if max_steps is not None and steps >= max_steps:
+			break
+
+		handler = engine.event_handler
+		try:
+			action = policy(engine)
+		except StopIteration:
+			break
+		steps += 1
+
+		if handler.handle_action(action):
+			turns += 1
+
+		if console is not None:
+			profiler = engine.profiler
+			render_start = profiler.start() if profiler is not None else 0
+			console.clear()
+			engine.event_handler.on_render(console)
+			if profiler is not None:
+				profiler.stop("render", render_start)
+
+	return SimulationResult(steps, turns, time.perf_counter() - start, engine.player.is_alive)
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description = "Run StrangeRL headless and report turns per second.")
+	parser.add_argument("--seed", type = int, default = None)
+	parser.add_argument("--turns", type = int, default = 1000)
+	parser.add_argument("--policy", choices = ["random", "scripted"], default = "random")
+	parser.add_argument("--map-size", type = int, default = 64)
+	parser.add_argument("--chunk-size", type = int, default = None, help = "store the map in lazily allocated chunks of this size")
+	parser.add_argument("--record", metavar = "PATH", help = "write every player action to an action log")
+	parser.add_argument("--replay", metavar = "PATH", help = "replay an action log at full speed, ignoring --policy and --turns")
+	parser.add_argument("--load", metavar = "DIRECTORY", help = "resume from a save instead of starting a new game")
+	parser.add_argument("--save", metavar = "DIRECTORY", help = "save the game once the run ends")
+	parser.add_argument("--render", action = "store_true", help = "also render every step to an off-screen console")
+	parser.add_argument("--profile", metavar = "PATH", help = "time each phase, print the timings and write a Chrome trace to PATH")
+	args = parser.parse_args()
+	# action logs replay from new_game, so a game resumed from a save can't be logged or replayed into
+	if args.load and (args.record or args.replay):
+		parser.error("--load can't be combined with --record or --replay")
+
+	policy: Policy
+	max_turns = args.turns
+	if args.replay:
+		with open(args.replay, "rb") as log_file:
+			header = read_header(log_file)
+			records = list(read_records(log_file))
+		engine = new_game(map_width = header.map_width, map_height = header.map_height, chunk_size = header.chunk_size, seed = header.seed)
+		policy = LoggedActionPolicy(records)
+		max_turns = len(records)
+	else:
+		if args.load:
+			# a save being written back over can't stay mapped
+			overwrites_save = args.save is not None and os.path.abspath(args.save) == os.path.abspath(args.load)
+			engine = load_game(args.load, memory_map = not overwrites_save)
+		else:
+			engine = new_game(map_width = args.map_size, map_height = args.map_size, chunk_size = args.chunk_size, seed = args.seed)
+
+		if args.policy == "random":
+			policy = RandomPolicy(args.seed)
+		else:
+			policy = ScriptedPolicy([(1, 0), (0, 1), (-1, 0), (0, -1), None])
+
+	if args.record:
+		engine.action_log = ActionRecorder(args.record, engine)
+	if args.profile:
+		engine.profiler = Profiler()
+
+	result = run(engine, policy, max_turns = max_turns, render = args.render)
+	if engine.action_log is not None:
+		engine.action_log.close()
+	if args.save:
+		save_game(engine, args.save)
+
+	print(
+		f"{result.turns} turns in {result.steps} steps, {result.seconds:.3f}s "
+		f"({result.turns_per_second:.1f} turns/s), player {'alive' if result.player_alive else 'dead'}"
+	)
+	if engine.profiler is not None:
+		for phase in PHASES:
+			stats = engine.profiler.stats(phase)
+			if stats.count:
+				print(f"{phase:<12} n={stats.count:<7} p50 {stats.p50:.3f}ms  p99 {stats.p99:.3f}ms  max {stats.max:.3f}ms")
+		engine.profiler.export_trace(args.profile)
+
+
+if __name__ == "__main__":
+	main()
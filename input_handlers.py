@@ -52,6 +52,9 @@ CONFIRM_KEYS = {
 	tcod.event.K_KP_ENTER
 }
 
+# shows or hides the profiler overlay, when the game runs with profiling on
+PROFILER_OVERLAY_KEY = tcod.event.K_F3
+
 CURSOR_Y_KEYS = {
 	tcod.event.K_UP: -1,
 	tcod.event.K_DOWN: 1,
@@ -64,26 +67,58 @@ class EventHandler(tcod.event.EventDispatch[Action]):
 		self.engine = engine
 
 	def handle_events(self, event: tcod.event.Event) -> None:
-		self.handle_action(self.dispatch(event))
+		profiler = self.engine.profiler
+		if profiler is None:
+			self.handle_action(self.dispatch(event))
+			return
+
+		if isinstance(event, tcod.event.KeyDown) and event.sym == PROFILER_OVERLAY_KEY:
+			profiler.toggle_overlay()
+			return
+		start = profiler.start()
+		action = self.dispatch(event)
+		profiler.stop("dispatch", start)
+		self.handle_action(action)
 
 	def handle_action(self, action: Optional[Action]) -> bool:
 		# returns True if action will advance a turn
 		if action is None:
 			return False
 
+		if self.engine.action_log is not None:
+			self.engine.action_log.record(action)
+
+		profiler = self.engine.profiler
+		if profiler is not None:
+			turn_start = start = profiler.start()
+
 		try:
 			action.perform()
 		except exceptions.Impossible as exc:
 			self.engine.message_log.add_message(exc.args[0], color.impossible)
 			return False # skip update on exceptions
+		finally:
+			if profiler is not None:
+				profiler.stop("perform", start)
+
+		if profiler is None:
+			self.engine.handle_enemy_turns(action.cost)
+			self.engine.update_fov()
+			return True
 
-		self.engine.handle_enemy_turns()
+		start = profiler.start()
+		self.engine.handle_enemy_turns(action.cost)
+		profiler.stop("enemy_turns", start)
+		start = profiler.start()
 		self.engine.update_fov()
+		profiler.stop("update_fov", start)
+		profiler.stop("turn", turn_start)
 		return True
 
 	def ev_mousemotion(self, event: tcod.event.MouseMotion) -> None:
-		if self.engine.game_map.in_bounds(event.tile.x, event.tile.y):
-			self.engine.mouse_location = event.tile.x, event.tile.y
+		location = self.engine.camera.to_map(event.tile.x, event.tile.y)
+		if location and self.engine.game_map.in_bounds(*location):
+			self.engine.mouse_location = location
 
 	def ev_quit(self, event: tcod.event.Quit) -> Optional[Action]:
 		raise SystemExit()
@@ -149,7 +184,8 @@ class HistoryViewer(EventHandler):
 			1,
 			log_console.width - 2,
 			log_console.height - 2,
-			self.engine.message_log.messages[ :self.cursor + 1]
+			self.engine.message_log.messages,
+			end = self.cursor + 1
 		)
 		log_console.blit(console, 3, 3)
 
@@ -223,7 +259,8 @@ class InventoryEventHandler(AskUserEventHandler):
 
 		width = len(self.TITLE) + 4
 
-		if self.engine.player.x <= 31:
+		player_screen_x, _ = self.engine.camera.to_screen(self.engine.player.x, self.engine.player.y)
+		if player_screen_x <= 31:
 			x = 64 - width
 		else:
 			x = 0
@@ -280,7 +317,7 @@ class SelectIndexHandler(AskUserEventHandler):
 
 	def on_render(self, console: tcod.Console) -> None:
 		super().on_render(console)
-		x, y = self.engine.mouse_location
+		x, y = self.engine.camera.to_screen(*self.engine.mouse_location)
 		console.rgb["bg"][x, y] = color.black
 		console.rgb["fg"][x, y] = color.white
 
@@ -300,8 +337,10 @@ class SelectIndexHandler(AskUserEventHandler):
 			dx, dy = MOVE_KEYS[key]
 			x += dx * modifier
 			y += dy * modifier
-			x = max(0, min(x, self.engine.game_map.width - 1))
-			y = max(0, min(y, self.engine.game_map.height - 1))
+			# keeps the cursor on the part of the map that's on screen
+			x0, y0 = self.engine.camera.x, self.engine.camera.y
+			x = max(x0, min(x, x0 + self.engine.camera.width - 1, self.engine.game_map.width - 1))
+			y = max(y0, min(y, y0 + self.engine.camera.height - 1, self.engine.game_map.height - 1))
 			self.engine.mouse_location = x, y
 			return None
 		elif key in CONFIRM_KEYS:
@@ -309,9 +348,10 @@ class SelectIndexHandler(AskUserEventHandler):
 		return super().ev_keydown(event)
 
 	def ev_mousebuttondown(self, event: tcod.event.MouseButtonDown) -> Optional[Action]:
-		if self.engine.game_map.in_bounds(*event.tile):
+		location = self.engine.camera.to_map(*event.tile)
+		if location and self.engine.game_map.in_bounds(*location):
 			if event.button == 1:
-				return self.on_index_select(*event.tile)
+				return self.on_index_select(*location)
 		return super().ev_mousebuttondown(event)
 
 	def on_index_select(self, x: int, y: int) -> Optional[Action]:
@@ -337,7 +377,7 @@ class AreaTargetHandler(SelectIndexHandler):
 
 	def on_render(self, console: tcod.Console) -> None:
 		super().on_render(console)
-		x, y = self.engine.mouse_location
+		x, y = self.engine.camera.to_screen(*self.engine.mouse_location)
 		console.draw_frame(
 			x = x - (self.radius + 1),
 			y = y - (self.radius + 1),
@@ -0,0 +1,127 @@
+from __future__ import annotations
+import collections
+import concurrent.futures
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple, Union, TYPE_CHECKING
+import numpy as np
+
+from chunked_array import ChunkedArray
+from engine import Engine
+import entity_factories
+from game_map import GameMap
+from procgen import generate_dungeon, item_table, monster_tables
+from prototypes import ActorPrototype, ItemPrototype
+from rng import RandomStreams
+
+if TYPE_CHECKING:
+	from entity import Actor
+
+# every prototype procgen can place, indexed by their position here in level payloads
+SPAWNABLE: List[Union[ActorPrototype, ItemPrototype]] = [
+	prototype for prototypes, _ in [*monster_tables.values(), item_table] for prototype in prototypes
+]
+_SPAWNABLE_IDS: Dict[str, int] = {prototype.name: i for i, prototype in enumerate(SPAWNABLE)}
+
+class LevelSettings(NamedTuple):
+	# the generate_dungeon arguments for one level, with the same defaults as setup_game.new_game
+	map_width: int = 64
+	map_height: int = 64
+	room_max_size: int = 16
+	room_min_size: int = 8
+	max_rooms: int = 32
+	max_monsters_per_room: int = 3
+	max_items_per_room: int = 5
+	chunk_size: Optional[int] = None
+
+class LevelPayload(NamedTuple):
+	# a generated level reduced to arrays, cheap to pickle between processes
+	settings: LevelSettings
+	player_start: Tuple[int, int]
+	tiles: Union[np.ndarray, Tuple[np.ndarray, np.ndarray]] # dense tiles, or chunk keys and stack when chunked
+	spawns: np.ndarray # SPAWNABLE index of every entity placed
+	spawn_xs: np.ndarray
+	spawn_ys: np.ndarray
+
+def generate_level_payload(settings: LevelSettings, seed: int, level: int) -> LevelPayload:
+	# runs in a worker process, generating a level around a stand-in player
+	# from its own streams, so the result only depends on the seed and level number
+	engine = Engine(player = entity_factories.player.build(), rng = RandomStreams(seed, level))
+	dungeon = generate_dungeon(engine = engine, **settings._asdict())
+	# ordered by position, since set order would differ between otherwise identical runs
+	spawned = sorted( (entity for entity in dungeon.entities if entity is not engine.player), key=lambda entity: (entity.x, entity.y) )
+
+	tiles = dungeon.tiles
+	return LevelPayload(
+		settings = settings,
+		player_start = (engine.player.x, engine.player.y),
+		tiles = tiles.to_arrays() if isinstance(tiles, ChunkedArray) else tiles,
+		spawns = np.fromiter((_SPAWNABLE_IDS[entity.name] for entity in spawned), dtype=np.int16, count=len(spawned)),
+		spawn_xs = np.fromiter((entity.x for entity in spawned), dtype=np.int32, count=len(spawned)),
+		spawn_ys = np.fromiter((entity.y for entity in spawned), dtype=np.int32, count=len(spawned))
+	)
+
+def build_level(payload: LevelPayload, engine: Engine, player: Actor) -> GameMap:
+	# turns a payload back into a map, with the given player standing at its start
+	settings = payload.settings
+	game_map = GameMap(engine, settings.map_width, settings.map_height, chunk_size = settings.chunk_size)
+	if isinstance(game_map.tiles, ChunkedArray):
+		game_map.tiles.load_arrays(*payload.tiles)
+	else:
+		game_map.tiles = payload.tiles
+
+	player.place(*payload.player_start, game_map)
+	for prototype_id, x, y in zip(payload.spawns.tolist(), payload.spawn_xs.tolist(), payload.spawn_ys.tolist()):
+		SPAWNABLE[prototype_id].spawn(game_map, x, y)
+	return game_map
+
+class LevelPipeline:
+	# Generates upcoming levels ahead of time on a process pool, so changing level only has to
+	# rebuild entities from an already carved payload instead of blocking on procgen.
+	# Levels are handed out in order, numbered from first_level, each generated from the streams
+	# for its number under the master seed, so they come out the same however many workers run.
+
+	def __init__(
+		self,
+		settings: LevelSettings = LevelSettings(),
+		ahead: int = 2,
+		max_workers: Optional[int] = None,
+		seed: Optional[int] = None,
+		first_level: int = 1
+	):
+		self.settings = settings
+		self.ahead = ahead
+		self.seed = RandomStreams(seed).seed
+		self.next_level = first_level
+		self.executor = concurrent.futures.ProcessPoolExecutor(max_workers = max_workers)
+		self.pending: Deque[concurrent.futures.Future[LevelPayload]] = collections.deque()
+		self.fill()
+
+	def fill(self) -> None:
+		# keeps ahead levels queued or generating
+		while len(self.pending) < self.ahead:
+			self.pending.append(self.executor.submit(generate_level_payload, self.settings, self.seed, self.next_level))
+			self.next_level += 1
+
+	def next_payload(self) -> LevelPayload:
+		# only blocks if the oldest queued level hasn't finished generating yet
+		if not self.pending:
+			self.fill()
+		payload = self.pending.popleft().result()
+		self.fill()
+		return payload
+
+	def change_level(self, engine: Engine) -> GameMap:
+		# moves the player onto the next pre-generated level
+		engine.game_map = build_level(self.next_payload(), engine, engine.player)
+		engine.update_fov()
+		return engine.game_map
+
+	def close(self) -> None:
+		# drops queued levels and waits only for those already generating, so no worker outlives the pool
+		self.executor.shutdown(wait = True, cancel_futures = True)
+		self.pending.clear()
+
+	def __enter__(self) -> LevelPipeline:
+		return self
+
+	def __exit__(self, *exc_info: object) -> None:
+		self.close()
@@ -1,51 +1,69 @@
 #!/usr/bin/env python3
-import copy
+import argparse
+import os
+import shutil
 import traceback
+from typing import Optional
 import tcod
 
 import color
+from action_log import ActionRecorder
 from engine import Engine
-import entity_factories
-from procgen import generate_dungeon
+from profiler import Profiler
+from save_game import LOAD_ERRORS, load_game, save_game
+from setup_game import new_game
 
-def main() -> None:
-	screen_width = 64
-	screen_height = 72
+SAVE_DIRECTORY = "savegame"
+# a save that can't be loaded is moved here, out of the way of the new game started in its place
+BROKEN_SAVE_DIRECTORY = "savegame.broken"
+# every action of a game started fresh is logged here, for replaying with headless.py --replay
+ACTION_LOG_PATH = "last_game.actions"
+# where a profiled session's trace is written on exit
+PROFILE_TRACE_PATH = "profile_trace.json"
 
-	map_width = 64
-	map_height = 64
+def save_on_exit(engine: Engine) -> None:
+	# a finished run leaves nothing to resume
+	if engine.player.is_alive:
+		save_game(engine, SAVE_DIRECTORY)
+	else:
+		shutil.rmtree(SAVE_DIRECTORY, ignore_errors=True)
 
-	room_max_size = 16
-	room_min_size = 8
-	max_rooms = 32
-	max_monsters_per_room = 3
-	max_items_per_room = 5
+def load_or_start_game() -> Engine:
+	# resumes the save if there is one, starting a new game when there isn't or it can't be read
+	load_error: Optional[Exception] = None
+	if os.path.isdir(SAVE_DIRECTORY):
+		try:
+			# read into memory rather than mapped, since quitting saves back over the same directory
+			return load_game(SAVE_DIRECTORY, memory_map = False)
+		except LOAD_ERRORS as exc:
+			traceback.print_exc()
+			load_error = exc
+			shutil.rmtree(BROKEN_SAVE_DIRECTORY, ignore_errors=True)
+			os.replace(SAVE_DIRECTORY, BROKEN_SAVE_DIRECTORY)
 
-	tileset = tcod.tileset.load_tilesheet(
-		"tiles.png",32,8,tcod.tileset.CHARMAP_TCOD
-	)
+	engine = new_game()
+	engine.action_log = ActionRecorder(ACTION_LOG_PATH, engine)
+	if load_error is not None:
+		engine.message_log.add_message(
+			f"The saved game couldn't be loaded ({load_error}), so it was moved to {BROKEN_SAVE_DIRECTORY}.", color.error
+		)
+	return engine
 
-	player = copy.deepcopy(entity_factories.player)
+def main() -> None:
+	parser = argparse.ArgumentParser(description = "Play StrangeRL.")
+	parser.add_argument("--profile", action = "store_true", help = f"time each phase of play, F3 shows the timings, a trace is written to {PROFILE_TRACE_PATH} on exit")
+	args = parser.parse_args()
 
-	engine = Engine(player = player)
+	screen_width = 64
+	screen_height = 72
 
-	engine.game_map = generate_dungeon(
-		max_rooms = max_rooms,
-		room_min_size = room_min_size,
-		room_max_size = room_max_size,
-		map_width = map_width,
-		map_height = map_height,
-		max_monsters_per_room = max_monsters_per_room,
-		max_items_per_room = max_items_per_room,
-		engine = engine
+	tileset = tcod.tileset.load_tilesheet(
+		"tiles.png",32,8,tcod.tileset.CHARMAP_TCOD
 	)
 
-	engine.update_fov()
-
-	engine.message_log.add_message(
-		"Somewhere in this asteroid's wretched tunnels, the notorious Pirate Captain Morgan makes his escape.",
-		color.welcome_text
-	)
+	engine = load_or_start_game()
+	if args.profile:
+		engine.profiler = Profiler()
 
 	with tcod.context.new_terminal(
 		screen_width,
@@ -56,18 +74,38 @@ def main() -> None:
 	) as context:
 		root_console = tcod.Console(screen_width, screen_height, order="F")
 
-		while True:
-			root_console.clear()
-			engine.event_handler.on_render(console=root_console)
-			context.present(root_console)
+		try:
+			while True:
+				profiler = engine.profiler
+				if profiler is None:
+					root_console.clear()
+					engine.event_handler.on_render(console=root_console)
+					context.present(root_console)
+				else:
+					start = profiler.start()
+					root_console.clear()
+					engine.event_handler.on_render(console=root_console)
+					profiler.stop("render", start)
+					if profiler.overlay_visible:
+						profiler.render(root_console)
+					start = profiler.start()
+					context.present(root_console)
+					profiler.stop("present", start)
 
-			try:
-				for event in tcod.event.wait():
-					context.convert_event(event)
-					engine.event_handler.handle_events(event)
-			except Exception:
-				traceback.print_exc()
-				engine.message_log.add_message(traceback.format_exc(), color.error)
+				try:
+					for event in tcod.event.wait():
+						context.convert_event(event)
+						engine.event_handler.handle_events(event)
+				except Exception:
+					traceback.print_exc()
+					engine.message_log.add_message(traceback.format_exc(), color.error)
+		except SystemExit:
+			save_on_exit(engine)
+			if engine.action_log is not None:
+				engine.action_log.close()
+			if engine.profiler is not None:
+				engine.profiler.export_trace(PROFILE_TRACE_PATH)
+			raise
 
 
 if __name__ == "__main__":
@@ -1,13 +1,19 @@
-from typing import Iterable, List, Reversible, Tuple
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+import collections
+import itertools
 import textwrap
 import tcod
 import color
 
 class Message:
+	__slots__ = ("plain_text", "fg", "count", "wrapped")
+
 	def __init__(self, text: str, fg: Tuple[int, int, int]):
 		self.plain_text = text
 		self.fg = fg
 		self.count = 1
+		# wrapped lines keyed by (count, width), filled in by MessageLog.wrap_message
+		self.wrapped: Dict[Tuple[int, int], List[str]] = {}
 
 	@property
 	def full_text(self) -> str:
@@ -16,15 +22,24 @@ class Message:
 		return self.plain_text
 
 class MessageLog:
-	def __init__(self) -> None:
-		self.messages: List[Message] = []
+	def __init__(self, capacity: int = 1024, spill_path: Optional[str] = None) -> None:
+		# oldest messages fall off the front once capacity is reached,
+		# and are appended to spill_path first when one is given
+		self.messages: Deque[Message] = collections.deque(maxlen=capacity)
+		self.spill_path = spill_path
 
 	def add_message(self, text: str, fg: Tuple[int, int, int] = color.white, *, stack: bool = True) -> None:
 		if stack and self.messages and text == self.messages[-1].plain_text:
 			self.messages[-1].count += 1
 		else:
+			if self.spill_path and len(self.messages) == self.messages.maxlen:
+				self.spill(self.messages[0])
 			self.messages.append(Message(text, fg))
 
+	def spill(self, message: Message) -> None:
+		with open(self.spill_path, "a", encoding="utf-8") as spill_file:
+			spill_file.write(message.full_text + "\n")
+
 	def render(self, console: tcod.Console, x: int, y: int, width: int, height: int) -> None:
 		self.render_messages(console, x, y, width, height, self.messages)
 
@@ -35,12 +50,27 @@ class MessageLog:
 			yield from textwrap.wrap(line, width, expand_tabs=True)
 
 	@classmethod
-	def render_messages(cls, console: tcod.Console, x: int, y: int, width: int, height: int, messages: Reversible[Message]) -> None:
+	def wrap_message(cls, message: Message, width: int) -> List[str]:
+		# only rewraps after the message stacks again or is drawn at a new width
+		key = (message.count, width)
+		lines = message.wrapped.get(key)
+		if lines is None:
+			if len(message.wrapped) > 1:
+				message.wrapped.clear()
+			lines = message.wrapped[key] = list(cls.wrap(message.full_text, width))
+		return lines
+
+	@classmethod
+	def render_messages(cls, console: tcod.Console, x: int, y: int, width: int, height: int, messages: Sequence[Message], end: Optional[int] = None) -> None:
+		# draws upward from the newest message, or from the one before index end, without copying the log
+		newest_first = reversed(messages)
+		if end is not None:
+			newest_first = itertools.islice(newest_first, len(messages) - end, None)
+
 		y_offset = height - 1
-		for message in reversed(messages):
-			for line in reversed(list(cls.wrap(message.full_text, width))):
+		for message in newest_first:
+			for line in reversed(cls.wrap_message(message, width)):
 				console.print(x=x, y=y+y_offset, string=line, fg=message.fg)
 				y_offset -= 1
 				if y_offset < 0:
 					return # no more space to print messages
-	
\ No newline at end of file
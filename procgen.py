@@ -1,15 +1,19 @@
 from __future__ import annotations
-import random
-from typing import Iterator, List, Tuple, TYPE_CHECKING
-import tcod
+from typing import List, Optional, Tuple, TypeVar, TYPE_CHECKING
+import numpy as np
 import entity_factories
 from game_map import GameMap
+from rng import RandomStreams
 import tile_types
 
 if TYPE_CHECKING:
 	from engine import Engine
 
+T = TypeVar("T")
+
 class RectangularRoom:
+	__slots__ = ("x1", "y1", "x2", "y2")
+
 	def __init__(self, x: int, y: int, width: int, height: int):
 		self.x1 = x
 		self.y1 = y
@@ -26,6 +30,11 @@ class RectangularRoom:
 	def inner(self) -> Tuple[slice, slice]:
 		return slice(self.x1 + 1, self.x2), slice(self.y1 + 1, self.y2)
 
+	@property
+	def outer(self) -> Tuple[slice, slice]:
+		# the whole room including its walls, the area intersects() compares
+		return slice(self.x1, self.x2 + 1), slice(self.y1, self.y2 + 1)
+
 	def intersects(self, other: RectangularRoom) -> bool:
 		return (
 			self.x1 <= other.x2
@@ -34,56 +43,68 @@ class RectangularRoom:
 			and self.y2 >= other.y1
 		)
 
+# spawn tables as (prototypes, cumulative weights), monsters keyed by room theme
+monster_tables = {
+	1: ([entity_factories.junkie, entity_factories.roider], [0.8, 1.0]),
+	2: ([entity_factories.dust_goon, entity_factories.dust_sicario], [0.8, 1.0]),
+}
+item_table = (
+	[entity_factories.smart_bandage, entity_factories.explosive_grenade, entity_factories.mace, entity_factories.printed_gun],
+	[0.4, 0.9, 0.99, 1.0]
+)
+
 def place_entities(
 	room: RectangularRoom,
 	dungeon: GameMap,
 	max_monsters: int,
-	max_items: int
+	max_items: int,
+	rng: np.random.Generator
 ) -> None:
-	number_of_monsters = random.randint(0, max_monsters)
-	number_of_items = random.randint(0, max_items)
-
-	room_theme = random.randint(1,2)
-
-	for i in range(number_of_monsters):
-		x = random.randint(room.x1 + 1, room.x2 - 1)
-		y = random.randint(room.y1 + 1, room.y2 - 1)
-
-		if not any(entity.x == x and entity.y == y for entity in dungeon.entities):
-			if random.random() < 0.8:
-				entity_factories.junkie.spawn(dungeon, x, y) if room_theme == 1 else entity_factories.dust_goon.spawn(dungeon, x, y)
-			else:
-				entity_factories.roider.spawn(dungeon, x, y) if room_theme == 1 else entity_factories.dust_sicario.spawn(dungeon, x, y)
-
-	for i in range(number_of_items):
-		x = random.randint(room.x1 + 1, room.x2 - 1)
-		y = random.randint(room.y1 + 1, room.y2 - 1)
-
-		if not any(entity.x == x and entity.y == y for entity in dungeon.entities):
-			item_chance = random.random()
-
-			if item_chance < 0.4:
-				entity_factories.smart_bandage.spawn(dungeon, x, y)
-			elif item_chance < 0.9:
-				entity_factories.explosive_grenade.spawn(dungeon, x, y)
-			elif item_chance < 0.99:
-				entity_factories.mace.spawn(dungeon, x, y)
-			else:
-				entity_factories.printed_gun.spawn(dungeon, x, y)
-
-# returns an L-shaped tunnel between two points
-def tunnel_between( start: Tuple[int, int], end: Tuple[int, int] ) -> Iterator[Tuple[int, int]]:
+	number_of_monsters = int(rng.integers(0, max_monsters + 1))
+	number_of_items = int(rng.integers(0, max_items + 1))
+
+	room_theme = int(rng.integers(1, 3))
+
+	# every spawn cell in the room is drawn at once from its unoccupied cells, monsters first
+	inner_x, inner_y = room.inner
+	free_x, free_y = np.nonzero(dungeon.occupancy[room.inner] == 0)
+	number_of_spawns = min(number_of_monsters + number_of_items, len(free_x))
+	number_of_monsters = min(number_of_monsters, number_of_spawns)
+	picks = rng.choice(len(free_x), size=number_of_spawns, replace=False)
+	spawn_xs = (free_x[picks] + inner_x.start).tolist()
+	spawn_ys = (free_y[picks] + inner_y.start).tolist()
+
+	monsters, monster_weights = monster_tables[room_theme]
+	items, item_weights = item_table
+	prototypes = (
+		weighted_choices(monsters, monster_weights, number_of_monsters, rng)
+		+ weighted_choices(items, item_weights, number_of_spawns - number_of_monsters, rng)
+	)
+
+	for prototype, x, y in zip(prototypes, spawn_xs, spawn_ys):
+		prototype.spawn(dungeon, x, y)
+
+# picks k of choices at once, weighted like random.choices' cum_weights
+def weighted_choices(choices: List[T], cum_weights: List[float], k: int, rng: np.random.Generator) -> List[T]:
+	picks = np.searchsorted(cum_weights, rng.random(k) * cum_weights[-1], side="right")
+	return [choices[pick] for pick in picks.tolist()]
+
+# returns an L-shaped tunnel between two points, as the two straight legs to carve
+def tunnel_between( start: Tuple[int, int], end: Tuple[int, int], rng: np.random.Generator ) -> Tuple[Tuple[slice, slice], Tuple[slice, slice]]:
 	x1, y1 = start
 	x2, y2 = end
-	if random.random() < 0.5:
+	if rng.random() < 0.5:
 		corner_x, corner_y = x2, y1
 	else:
 		corner_x, corner_y = x1, y2
 
-	for x, y in tcod.los.bresenham( (x1, y1), (corner_x, corner_y) ).tolist():
-		yield x, y
-	for x, y in tcod.los.bresenham( (corner_x, corner_y), (x2, y2) ).tolist():
-		yield x, y
+	return straight_line( (x1, y1), (corner_x, corner_y) ), straight_line( (corner_x, corner_y), (x2, y2) )
+
+# returns the slices covering a horizontal or vertical line between two points, inclusive
+def straight_line( start: Tuple[int, int], end: Tuple[int, int] ) -> Tuple[slice, slice]:
+	x1, y1 = start
+	x2, y2 = end
+	return slice(min(x1, x2), max(x1, x2) + 1), slice(min(y1, y2), max(y1, y2) + 1)
 
 def generate_dungeon(
 	max_rooms: int,
@@ -93,32 +114,41 @@ def generate_dungeon(
 	map_height: int,
 	max_monsters_per_room: int,
 	max_items_per_room: int,
-	engine: Engine
+	engine: Engine,
+	chunk_size: Optional[int] = None,
+	rng: Optional[RandomStreams] = None
 ) -> GameMap:
+	# each part of generation draws from its own stream, the engine's by default
+	if rng is None:
+		rng = engine.rng
+	room_rng, tunnel_rng, spawn_rng = rng.get("rooms"), rng.get("tunnels"), rng.get("spawns")
+
 	player = engine.player
-	dungeon = GameMap(engine, map_width, map_height, entities=[player])
+	dungeon = GameMap(engine, map_width, map_height, entities=[player], chunk_size=chunk_size)
 	rooms: List[RectangularRoom] = []
+	# cells covered by an accepted room, edges included, so overlap checks don't walk every other room
+	room_footprints = dungeon.new_layer(bool, False)
 
 	for r in range(max_rooms):
-		room_width = random.randint(room_min_size, room_max_size)
-		room_height = random.randint(room_min_size, room_max_size)
+		room_width, room_height = room_rng.integers(room_min_size, room_max_size + 1, size=2).tolist()
 
-		x = random.randint(0, dungeon.width - room_width - 1)
-		y = random.randint(0, dungeon.height - room_height - 1)
+		x = int(room_rng.integers(0, dungeon.width - room_width))
+		y = int(room_rng.integers(0, dungeon.height - room_height))
 
 		new_room = RectangularRoom(x, y, room_width, room_height)
 
-		if any(new_room.intersects(other_room) for other_room in rooms):
+		if room_footprints[new_room.outer].any():
 			continue
+		room_footprints[new_room.outer] = True
 		dungeon.tiles[new_room.inner] = tile_types.floor
 
 		if len(rooms) == 0:
 			player.place(*new_room.center, dungeon)
 		else:
-			for x, y in tunnel_between(rooms[-1].center, new_room.center):
-				dungeon.tiles[x,y] = tile_types.floor
+			for leg in tunnel_between(rooms[-1].center, new_room.center, tunnel_rng):
+				dungeon.tiles[leg] = tile_types.floor
 
-		place_entities(new_room, dungeon, max_monsters_per_room, max_items_per_room)
+		place_entities(new_room, dungeon, max_monsters_per_room, max_items_per_room, spawn_rng)
 
 		rooms.append(new_room)
 
@@ -0,0 +1,90 @@
+from __future__ import annotations
+import collections
+import json
+import time
+from typing import Deque, Dict, List, NamedTuple, Tuple, TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:
+	from tcod import Console
+
+# the phases of a turn and a frame, in the order the overlay lists them
+PHASES = ("turn", "dispatch", "perform", "enemy_turns", "update_fov", "render", "present")
+# rolling statistics cover this many of the most recent samples of each phase
+PHASE_WINDOW = 512
+# the trace keeps only this many of the most recent spans, so a long session can't grow it without bound
+TRACE_LIMIT = 200_000
+
+class PhaseStats(NamedTuple):
+	# durations in milliseconds
+	count: int
+	p50: float
+	p99: float
+	max: float
+
+class Profiler:
+	# Times the phases of each turn and frame. Call sites hold engine.profiler, which is None
+	# unless profiling was asked for, so a disabled profiler costs one attribute check per phase.
+	#   start = profiler.start()
+	#   ...
+	#   profiler.stop("perform", start)
+	# Spans are kept both as rolling per-phase samples for the overlay and as a trace that
+	# export_trace writes in the Chrome trace event format, for chrome://tracing or Perfetto.
+
+	def __init__(self, window: int = PHASE_WINDOW, trace_limit: int = TRACE_LIMIT):
+		self.window = window
+		self.origin = time.perf_counter_ns()
+		self.samples: Dict[str, np.ndarray] = {}
+		self.counts: Dict[str, int] = {}
+		# phase, start and duration in nanoseconds from origin
+		self.spans: Deque[Tuple[str, int, int]] = collections.deque(maxlen = trace_limit)
+		self.overlay_visible = False
+
+	def start(self) -> int:
+		return time.perf_counter_ns()
+
+	def stop(self, phase: str, start: int) -> None:
+		duration = time.perf_counter_ns() - start
+		samples = self.samples.get(phase)
+		if samples is None:
+			samples = self.samples[phase] = np.zeros(self.window, dtype=np.int64)
+			self.counts[phase] = 0
+		count = self.counts[phase]
+		samples[count % self.window] = duration
+		self.counts[phase] = count + 1
+		self.spans.append((phase, start - self.origin, duration))
+
+	def stats(self, phase: str) -> PhaseStats:
+		count = self.counts.get(phase, 0)
+		if not count:
+			return PhaseStats(0, 0.0, 0.0, 0.0)
+		recent = self.samples[phase][:min(count, self.window)] / 1e6
+		p50, p99 = np.percentile(recent, (50, 99)).tolist()
+		return PhaseStats(count, p50, p99, float(recent.max()))
+
+	def toggle_overlay(self) -> None:
+		self.overlay_visible = not self.overlay_visible
+
+	def render(self, console: Console, x: int = 0, y: int = 0) -> None:
+		lines: List[str] = [f"{'phase':<12}{'p50':>7}{'p99':>7}{'max':>7}"]
+		for phase in PHASES:
+			stats = self.stats(phase)
+			if stats.count:
+				lines.append(f"{phase:<12}{stats.p50:7.2f}{stats.p99:7.2f}{stats.max:7.2f}")
+
+		width = max(len(line) for line in lines) + 2
+		console.draw_frame(
+			x = x, y = y, width = width, height = len(lines) + 2,
+			title = "ms", clear = True, fg = (201, 226, 255), bg = (0, 0, 0)
+		)
+		for i, line in enumerate(lines):
+			console.print(x + 1, y + 1 + i, line)
+
+	def export_trace(self, path: str) -> None:
+		# complete ("X") events, timestamps and durations in microseconds
+		events = [
+			{"name": phase, "cat": "turn", "ph": "X", "ts": start / 1e3, "dur": duration / 1e3, "pid": 0, "tid": 0}
+			for phase, start, duration in self.spans
+		]
+		with open(path, "w", encoding="utf-8") as trace_file:
+			json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+from typing import Callable, NamedTuple, Tuple, Type, TYPE_CHECKING
+from components.fighter import Fighter
+from components.inventory import Inventory
+from entity import Actor, Item, NORMAL_SPEED
+
+if TYPE_CHECKING:
+	from components.ai import BaseAI
+	from components.consumable import Consumable
+	from game_map import GameMap
+
+# Prototypes describe an entity in a few plain fields and build fresh instances with their components,
+# rather than deep-copying a template entity and its whole object graph on every spawn
+
+class ActorPrototype(NamedTuple):
+	char: str
+	color: Tuple[int, int, int]
+	name: str
+	ai_cls: Type[BaseAI]
+	hp: int
+	defense: int
+	power: int
+	capacity: int
+	speed: int = NORMAL_SPEED
+
+	def build(self) -> Actor:
+		return Actor(
+			char = self.char,
+			color = self.color,
+			name = self.name,
+			ai_cls = self.ai_cls,
+			fighter = Fighter(hp = self.hp, defense = self.defense, power = self.power),
+			inventory = Inventory(capacity = self.capacity),
+			speed = self.speed
+		)
+
+	def spawn(self, game_map: GameMap, x: int, y: int) -> Actor:
+		actor = self.build()
+		actor.place(x, y, game_map)
+		return actor
+
+class ItemPrototype(NamedTuple):
+	char: str
+	color: Tuple[int, int, int]
+	name: str
+	consumable: Callable[[], Consumable] # e.g. a functools.partial of the consumable class
+
+	def build(self) -> Item:
+		return Item(
+			char = self.char,
+			color = self.color,
+			name = self.name,
+			consumable = self.consumable()
+		)
+
+	def spawn(self, game_map: GameMap, x: int, y: int) -> Item:
+		item = self.build()
+		item.place(x, y, game_map)
+		return item
@@ -11,9 +11,13 @@ def get_names_at_location(x: int, y: int, game_map: GameMap) -> str:
 	if not game_map.in_bounds(x,y) or not game_map.visible[x,y]:
 		return ""
 
-	names = ", ".join(entity.name for entity in game_map.entities if entity.x == x and entity.y == y)
+	names = [entity.name for entity in game_map.get_entities_at_location(x, y)]
 
-	return names
+	decal_name = game_map.decals.name_at(x, y)
+	if decal_name:
+		names.insert(0, decal_name)
+
+	return ", ".join(names)
 
 def render_bar(console: Console, current_value: int, max_value: int, total_width: int) -> None:
 	bar_width = int( (float(current_value) / max_value) * total_width )
@@ -0,0 +1,34 @@
+from __future__ import annotations
+import zlib
+from typing import Any, Dict, Optional
+import numpy as np
+
+class RandomStreams:
+	# Independent NumPy generators for each subsystem (room layout, tunnels, spawns, ai, ...),
+	# derived from a master seed and a level number. A subsystem's draws never shift because another
+	# subsystem drew more or less, and levels can be generated in any order, or in parallel, with the same results.
+
+	def __init__(self, seed: Optional[int] = None, level: int = 0):
+		# without a seed, fresh entropy is drawn and kept so the run can still be reproduced
+		self.seed: int = seed if seed is not None else int(np.random.SeedSequence().entropy)
+		self.level = level
+		self._generators: Dict[str, np.random.Generator] = {}
+
+	def get(self, subsystem: str) -> np.random.Generator:
+		generator = self._generators.get(subsystem)
+		if generator is None:
+			# crc32 rather than hash(), which is salted differently in every process
+			entropy = [self.seed, self.level, zlib.crc32(subsystem.encode())]
+			generator = self._generators[subsystem] = np.random.default_rng(np.random.SeedSequence(entropy))
+		return generator
+
+	def for_level(self, level: int) -> RandomStreams:
+		return RandomStreams(self.seed, level)
+
+	def get_state(self) -> Dict[str, Any]:
+		# the position of every stream drawn from so far, as plain JSON-friendly values
+		return {subsystem: generator.bit_generator.state for subsystem, generator in self._generators.items()}
+
+	def set_state(self, state: Dict[str, Any]) -> None:
+		for subsystem, bit_generator_state in state.items():
+			self.get(subsystem).bit_generator.state = bit_generator_state
@@ -0,0 +1,351 @@
+from __future__ import annotations
+import collections
+import json
+import os
+import shutil
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple, Type, TYPE_CHECKING
+import numpy as np
+
+from chunked_array import ChunkedArray
+from components import consumable
+from components.ai import BaseAI, ConfusedAI, HostileAI
+from components.fighter import Fighter
+from components.inventory import Inventory
+from engine import Engine
+from entity import Actor, Entity, Item
+from game_map import GameMap
+from input_handlers import GameOverEventHandler
+from message_log import Message
+from render_order import RenderOrder
+from rng import RandomStreams
+
+if TYPE_CHECKING:
+	from game_map import MapArray
+
+# A save is a directory holding:
+#   meta.json      map size and storage, the string table, decal table, random streams, scheduler clock and message log
+#   <layer>.npy    tiles, visible, explored and decal IDs as raw arrays, memory-mapped copy-on-write on load,
+#                  or for chunked maps <layer>.keys.npy and <layer>.chunks.npy holding the allocated chunks
+#   entities.npz   one row per entity, on the map or in an actor's inventory, as parallel columns,
+#                  plus the steps of every hostile's cached path, flattened, in path_steps,
+#                  and the scheduler's queue as rows and times, in the order it would be popped
+# Occupancy and blockers aren't saved, they are rebuilt as the entities are placed back on the map.
+# Actors are saved in the order they hold their actor store slots, and the queue keeps its stale
+# entries, so a resumed game takes its turns in exactly the order the saved one would have.
+
+SAVE_VERSION = 4
+LAYERS = ("tiles", "visible", "explored", "decals")
+# what load_game raises for a save from another version or layout, or one that was cut short
+LOAD_ERRORS = (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile)
+
+AI_CLASSES: Dict[str, Type[BaseAI]] = {cls.__name__: cls for cls in (HostileAI, ConfusedAI)}
+CONSUMABLE_CLASSES: Dict[str, Type[consumable.Consumable]] = {
+	cls.__name__: cls for cls in (
+		consumable.HealingConsumable,
+		consumable.ConfusionConsumable,
+		consumable.ExplosionDamageConsumable,
+		consumable.BallisticDamageConsumable
+	)
+}
+# the integer settings each consumable is saved with, passed back to its constructor by name
+CONSUMABLE_FIELDS: Dict[str, Tuple[str, ...]] = {
+	"HealingConsumable": ("amount",),
+	"ConfusionConsumable": ("ticks",),
+	"ExplosionDamageConsumable": ("damage", "radius"),
+	"BallisticDamageConsumable": ("damage", "max_range"),
+}
+# columns of consumable_args, enough for the consumable with the most settings
+CONSUMABLE_ARGS = max(len(fields) for fields in CONSUMABLE_FIELDS.values())
+
+def _consumable_fields(item_consumable: consumable.Consumable) -> Tuple[str, ...]:
+	# refuses consumables whose settings the table doesn't list exactly, rather than saving some of them
+	name = type(item_consumable).__name__
+	fields = CONSUMABLE_FIELDS.get(name)
+	if fields is None or set(fields) != set(type(item_consumable).__slots__):
+		raise ValueError(f"{name} isn't listed with all of its settings in CONSUMABLE_FIELDS.")
+	return fields
+
+def _layer_of(game_map: GameMap, name: str) -> MapArray:
+	return game_map.decals.cells if name == "decals" else getattr(game_map, name)
+
+def _save_layer(directory: str, name: str, layer: MapArray) -> None:
+	if isinstance(layer, ChunkedArray):
+		keys, chunks = layer.to_arrays()
+		np.save(os.path.join(directory, f"{name}.keys.npy"), keys)
+		np.save(os.path.join(directory, f"{name}.chunks.npy"), chunks)
+	else:
+		np.save(os.path.join(directory, f"{name}.npy"), np.asfortranarray(layer))
+
+def _load_layer(directory: str, name: str, layer: MapArray, memory_map: bool) -> MapArray:
+	# mode "c" maps the file copy-on-write, so play can change the arrays without touching the save
+	mmap_mode = "c" if memory_map else None
+	if isinstance(layer, ChunkedArray):
+		keys = np.load(os.path.join(directory, f"{name}.keys.npy"))
+		layer.load_arrays(keys, np.load(os.path.join(directory, f"{name}.chunks.npy"), mmap_mode=mmap_mode))
+		return layer
+	return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+
+def _map_entities(game_map: GameMap) -> List[Entity]:
+	# actors in actor store slot order, which area queries and so waking follow,
+	# then everything else in the order it lies on each cell, which pickup follows
+	if game_map.actor_store is not None:
+		store = game_map.actor_store
+		actors: List[Entity] = [actor for actor in store.actors[:store.size] if actor is not None]
+	else:
+		actors = [entity for entity in game_map.entities if isinstance(entity, Actor)]
+	others = [entity for cell in game_map.entity_cells.values() for entity in cell if not isinstance(entity, Actor)]
+	return actors + others
+
+def _collect_entities(engine: Engine) -> Tuple[List[Entity], Dict[Entity, int]]:
+	# map entities first, each actor followed by its inventory, with owners mapped to their row
+	rows: List[Entity] = []
+	owners: Dict[Entity, int] = {}
+	for entity in _map_entities(engine.game_map):
+		row = len(rows)
+		rows.append(entity)
+		if isinstance(entity, Actor):
+			for item in entity.inventory.items:
+				owners[item] = row
+				rows.append(item)
+	return rows, owners
+
+def _hostile_ai(actor: Actor) -> Optional[HostileAI]:
+	# the actor's hostile ai, kept waiting under any confusion along with its path
+	ai = actor.ai
+	while isinstance(ai, ConfusedAI):
+		ai = ai.previous_ai
+	return ai if isinstance(ai, HostileAI) else None
+
+def save_game(engine: Engine, directory: str) -> None:
+	# writes to a scratch directory first, swapping it in once complete
+	scratch = directory + ".tmp"
+	shutil.rmtree(scratch, ignore_errors=True)
+	os.makedirs(scratch)
+
+	game_map = engine.game_map
+	for name in LAYERS:
+		_save_layer(scratch, name, _layer_of(game_map, name))
+
+	strings: Dict[str, int] = {}
+	def string_id(value: Optional[str]) -> int:
+		if value is None:
+			return -1
+		return strings.setdefault(value, len(strings))
+
+	rows, owners = _collect_entities(engine)
+	row_of = {entity: row for row, entity in enumerate(rows)}
+	scheduler = engine.scheduler
+	count = len(rows)
+	columns: Dict[str, np.ndarray] = {
+		"is_actor": np.fromiter((isinstance(entity, Actor) for entity in rows), dtype=bool, count=count),
+		"x": np.fromiter((entity.x for entity in rows), dtype=np.int32, count=count),
+		"y": np.fromiter((entity.y for entity in rows), dtype=np.int32, count=count),
+		"owner": np.fromiter((owners.get(entity, -1) for entity in rows), dtype=np.int32, count=count),
+		"char": np.fromiter((ord(entity.char) for entity in rows), dtype=np.int32, count=count),
+		"color": np.array([entity.color for entity in rows], dtype=np.uint8).reshape(count, 3),
+		"name": np.fromiter((string_id(entity.name) for entity in rows), dtype=np.int32, count=count),
+		"blocks_movement": np.fromiter((entity.blocks_movement for entity in rows), dtype=bool, count=count),
+		"render_order": np.fromiter((entity.render_order.value for entity in rows), dtype=np.int8, count=count),
+	}
+
+	actor_stats = np.zeros( (count, 6), dtype=np.int32 ) # hp, max_hp, defense, power, capacity, speed
+	ai = np.full( (count, 3), -1, dtype=np.int32 ) # class, previous class, ticks
+	schedule = np.full( (count, 2), -1, dtype=np.int64 ) # due time, awake until
+	paths = np.zeros( (count, 4), dtype=np.int64 ) # step count, tiles version, blockers version, detour
+	path_steps: List[Tuple[int, int]] = []
+	consumables = np.full(count, -1, dtype=np.int32)
+	consumable_args = np.zeros( (count, CONSUMABLE_ARGS), dtype=np.int32 )
+
+	for row, entity in enumerate(rows):
+		if isinstance(entity, Actor):
+			fighter = entity.fighter
+			actor_stats[row] = fighter.hp, fighter.max_hp, fighter.defense, fighter.power, entity.inventory.capacity, entity.speed
+			if entity.ai is not None:
+				ai[row, 0] = string_id(type(entity.ai).__name__)
+				if isinstance(entity.ai, ConfusedAI):
+					# nested confusion is flattened, recovering straight to the innermost ai
+					previous = entity.ai.previous_ai
+					while isinstance(previous, ConfusedAI):
+						previous = previous.previous_ai
+					ai[row, 1] = string_id(type(previous).__name__ if previous is not None else None)
+					ai[row, 2] = entity.ai.ticks
+			hostile = _hostile_ai(entity)
+			if hostile is not None:
+				paths[row] = len(hostile.path), *hostile.path_versions, hostile.path_detour
+				path_steps.extend(hostile.path)
+			if entity in scheduler.due:
+				schedule[row, 0] = scheduler.due[entity]
+			if entity in scheduler.awake:
+				schedule[row, 1] = scheduler.awake[entity]
+		elif isinstance(entity, Item):
+			item_consumable = entity.consumable
+			consumables[row] = string_id(type(item_consumable).__name__)
+			for i, field in enumerate(_consumable_fields(item_consumable)):
+				consumable_args[row, i] = getattr(item_consumable, field)
+
+	columns.update(
+		actor_stats=actor_stats, ai=ai, schedule=schedule, paths=paths,
+		path_steps=np.array(path_steps, dtype=np.int32).reshape(-1, 2),
+		# entries for actors no longer on the map would only be skipped, so they're left out
+		queue=np.array([(row_of[actor], time) for time, actor in scheduler.get_queue() if actor in row_of], dtype=np.int64).reshape(-1, 2),
+		consumable=consumables, consumable_args=consumable_args
+	)
+	np.savez(os.path.join(scratch, "entities.npz"), **columns)
+
+	decals = game_map.decals
+	meta = {
+		"version": SAVE_VERSION,
+		"width": game_map.width,
+		"height": game_map.height,
+		"chunk_size": game_map.chunk_size,
+		"player": rows.index(engine.player),
+		"strings": list(strings),
+		"decals": [[chr(char), color.tolist(), name] for char, color, name in zip(decals.chars[1:], decals.colors[1:], decals.names[1:])],
+		"decal_count": decals.count,
+		# which setting each consumable_args column holds, by consumable
+		"consumable_fields": CONSUMABLE_FIELDS,
+		"rng": {"seed": engine.rng.seed, "level": engine.rng.level, "state": engine.rng.get_state()},
+		"scheduler": {"time": scheduler.time, "started": scheduler.started},
+		"versions": [game_map.tiles_version, game_map.blockers_version],
+		"message_capacity": engine.message_log.messages.maxlen,
+		"messages": [[message.plain_text, list(message.fg), message.count] for message in engine.message_log.messages],
+	}
+	with open(os.path.join(scratch, "meta.json"), "w", encoding="utf-8") as meta_file:
+		json.dump(meta, meta_file)
+
+	shutil.rmtree(directory, ignore_errors=True)
+	os.replace(scratch, directory)
+
+def _build_entity(
+	columns: Dict[str, np.ndarray],
+	row: int,
+	strings: List[str],
+	consumable_fields: Dict[str, List[str]]
+) -> Entity:
+	def string(index: int) -> Optional[str]:
+		return strings[index] if index >= 0 else None
+
+	common: Dict[str, Any] = dict(
+		x = int(columns["x"][row]),
+		y = int(columns["y"][row]),
+		char = chr(columns["char"][row]),
+		color = tuple(columns["color"][row].tolist()),
+		name = string(int(columns["name"][row])),
+	)
+
+	entity: Entity
+	if columns["is_actor"][row]:
+		hp, max_hp, defense, power, capacity, speed = columns["actor_stats"][row].tolist()
+		ai_class, previous_class, ticks = columns["ai"][row].tolist()
+		fighter = Fighter(hp = max_hp, defense = defense, power = power)
+		fighter._hp = hp # bypasses the setter, which expects the actor to be on a map already
+		actor = Actor(
+			ai_cls = HostileAI,
+			fighter = fighter,
+			inventory = Inventory(capacity = capacity),
+			speed = speed,
+			**common
+		)
+		if ai_class < 0:
+			actor.ai = None
+		elif AI_CLASSES[strings[ai_class]] is ConfusedAI:
+			previous_ai = AI_CLASSES[strings[previous_class]](actor) if previous_class >= 0 else None
+			actor.ai = ConfusedAI(actor, previous_ai, ticks)
+		else:
+			actor.ai = AI_CLASSES[strings[ai_class]](actor)
+		entity = actor
+	else:
+		class_name = strings[columns["consumable"][row]]
+		fields = consumable_fields[class_name]
+		args = columns["consumable_args"][row].tolist()
+		if len(fields) > len(args):
+			raise ValueError(f"The save holds {len(args)} settings per consumable, {class_name} needs {len(fields)}.")
+		entity = Item(consumable = CONSUMABLE_CLASSES[class_name](**dict(zip(fields, args))), **common)
+
+	entity.blocks_movement = bool(columns["blocks_movement"][row])
+	entity.render_order = RenderOrder(int(columns["render_order"][row]))
+	return entity
+
+def _restore_turns(engine: Engine, rows: List[Entity], columns: Dict[str, np.ndarray], meta: Dict[str, Any]) -> None:
+	# puts back cached paths and the scheduler's clock, queue and awake actors, once the entities are placed
+	game_map = engine.game_map
+	# placing the entities bumped the versions, which the saved paths were checked against
+	game_map.tiles_version, game_map.blockers_version = meta["versions"]
+
+	path_steps = columns["path_steps"].tolist()
+	next_step = 0
+	due: Dict[Actor, int] = {}
+	awake: Dict[Actor, int] = {}
+
+	for row, entity in enumerate(rows):
+		if not isinstance(entity, Actor):
+			continue
+		step_count, tiles_version, blockers_version, detour = columns["paths"][row].tolist()
+		hostile = _hostile_ai(entity)
+		if hostile is not None:
+			hostile.path = collections.deque(tuple(step) for step in path_steps[next_step:next_step + step_count])
+			hostile.path_versions = (tiles_version, blockers_version)
+			hostile.path_detour = detour
+		next_step += step_count
+
+		due_time, awake_until = columns["schedule"][row].tolist()
+		if due_time >= 0:
+			due[entity] = due_time
+		if awake_until >= 0:
+			awake[entity] = awake_until
+
+	queue = [(time, rows[row]) for row, time in columns["queue"].tolist()]
+	engine.scheduler.restore(
+		game_map if meta["scheduler"]["started"] else None, meta["scheduler"]["time"], due, awake, queue
+	)
+
+def load_game(directory: str, memory_map: bool = True) -> Engine:
+	# a game that will be saved back over its own directory has to be loaded without memory_map,
+	# since on Windows the save can't be deleted or replaced while its files are still mapped
+	with open(os.path.join(directory, "meta.json"), encoding="utf-8") as meta_file:
+		meta = json.load(meta_file)
+	if meta["version"] != SAVE_VERSION:
+		raise ValueError(f"Unsupported save version {meta['version']}.")
+
+	with np.load(os.path.join(directory, "entities.npz")) as entities_file:
+		columns = dict(entities_file)
+	strings: List[str] = meta["strings"]
+	rows = [_build_entity(columns, row, strings, meta["consumable_fields"]) for row in range(len(columns["x"]))]
+	player = rows[meta["player"]]
+	assert isinstance(player, Actor)
+
+	rng = RandomStreams(meta["rng"]["seed"], meta["rng"]["level"])
+	rng.set_state(meta["rng"]["state"])
+	engine = Engine(player = player, rng = rng)
+	game_map = GameMap(engine, meta["width"], meta["height"], chunk_size = meta["chunk_size"])
+	game_map.tiles = _load_layer(directory, "tiles", game_map.tiles, memory_map)
+	game_map.visible = _load_layer(directory, "visible", game_map.visible, memory_map)
+	game_map.explored = _load_layer(directory, "explored", game_map.explored, memory_map)
+	game_map.decals.cells = _load_layer(directory, "decals", game_map.decals.cells, memory_map)
+	for char, color, name in meta["decals"]:
+		game_map.decals.intern(char, tuple(color), name)
+	game_map.decals.count = meta["decal_count"]
+	engine.game_map = game_map
+
+	for row, entity in enumerate(rows):
+		owner = int(columns["owner"][row])
+		if owner < 0:
+			entity.place(entity.x, entity.y, game_map)
+		else:
+			inventory = rows[owner].inventory
+			entity.parent = inventory
+			inventory.items.append(entity)
+	_restore_turns(engine, rows, columns, meta)
+
+	message_log = engine.message_log
+	message_log.messages = collections.deque(maxlen = meta["message_capacity"])
+	for text, fg, count in meta["messages"]:
+		message = Message(text, tuple(fg))
+		message.count = count
+		message_log.messages.append(message)
+
+	if not player.is_alive:
+		engine.event_handler = GameOverEventHandler(engine)
+	engine.update_fov()
+	return engine
@@ -0,0 +1,135 @@
+from __future__ import annotations
+import heapq
+import itertools
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+from actions import ACTION_COST
+from entity import NORMAL_SPEED
+import exceptions
+
+if TYPE_CHECKING:
+	from engine import Engine
+	from entity import Actor
+	from game_map import GameMap
+
+# actors within this many moves of the player are kept awake
+ACTIVITY_RADIUS = 16
+# dormant actors wait this many times longer between actions
+DORMANT_INTERVAL = 8
+# how long an actor woken by a noise stays awake, even while far away with nothing to do
+WAKE_TIME = 10 * ACTION_COST
+
+class TurnScheduler:
+	# Runs actors' turns in the order they come due, from a heap of (time, order, actor) entries.
+	# An action costing cost takes cost * NORMAL_SPEED / speed time, so fast actors come up more often,
+	# and each action is one pop and one push. Rescheduling leaves the old entry in the heap, which is
+	# skipped as stale when popped, as are entries for actors that died or left the map.
+	#
+	# Actors near the player, or woken by a noise, are awake. Once an awake actor is out of range with
+	# nothing left to do it falls dormant and is rescheduled DORMANT_INTERVAL times further out, so the
+	# cost of a turn follows the actors around the player rather than the level's population.
+
+	def __init__(self, engine: Engine):
+		self.engine = engine
+		self.time = 0
+		self.queue: List[Tuple[int, int, Actor]] = []
+		# when each scheduled actor's live heap entry is due
+		self.due: Dict[Actor, int] = {}
+		# awake actors, mapped to the time they are kept awake until regardless of range
+		self.awake: Dict[Actor, int] = {}
+		self._order = itertools.count() # breaks ties between entries due at once, first scheduled first
+		self._game_map: Optional[GameMap] = None
+
+	def delay(self, actor: Actor, cost: int) -> int:
+		return max(1, cost * NORMAL_SPEED // max(1, actor.speed))
+
+	def schedule(self, actor: Actor, time: int) -> None:
+		self.due[actor] = time
+		heapq.heappush(self.queue, (time, next(self._order), actor))
+
+	def wake(self, actor: Actor, duration: int = WAKE_TIME) -> None:
+		# a dormant actor is brought forward to act in the current phase
+		if actor not in self.awake:
+			self.awake[actor] = self.time + duration
+			if actor not in self.due or self.due[actor] > self.time:
+				self.schedule(actor, self.time)
+		else:
+			self.awake[actor] = max(self.awake[actor], self.time + duration)
+
+	def make_noise(self, x: int, y: int, radius: float) -> None:
+		# wakes every actor that can hear a noise made at (x, y)
+		for actor in self.engine.game_map.get_actors_within_radius(x, y, radius):
+			if actor is not self.engine.player:
+				self.wake(actor)
+
+	@property
+	def started(self) -> bool:
+		# whether an enemy phase has run on the current map, seeding the queue for it
+		return self._game_map is self.engine.game_map
+
+	def get_queue(self) -> List[Tuple[int, Actor]]:
+		# every heap entry, stale ones included, as (time, actor) in the order they would be popped
+		return [(time, actor) for time, _, actor in sorted(self.queue)]
+
+	def restore(
+		self,
+		game_map: Optional[GameMap],
+		time: int,
+		due: Dict[Actor, int],
+		awake: Dict[Actor, int],
+		queue: List[Tuple[int, Actor]]
+	) -> None:
+		# puts back state read from get_queue, due and awake, as when loading a save,
+		# with game_map None if no phase had run on the map yet
+		self.time = time
+		self.due = due
+		self.awake = awake
+		self.queue = []
+		for entry_time, actor in queue:
+			heapq.heappush(self.queue, (entry_time, next(self._order), actor))
+		self._game_map = game_map
+
+	def _reset(self, game_map: GameMap) -> None:
+		# every actor on a new map starts dormant, their first turns spread across the dormant interval
+		self.queue.clear()
+		self.due.clear()
+		self.awake.clear()
+		self._game_map = game_map
+		for offset in range(DORMANT_INTERVAL):
+			for actor in game_map.get_staggered_actors(offset, DORMANT_INTERVAL):
+				if actor is not self.engine.player:
+					self.schedule(actor, self.time + offset * ACTION_COST)
+
+	def advance(self, player_cost: int = ACTION_COST) -> None:
+		# moves time on by the player's last action, letting every actor due by then act
+		game_map = self.engine.game_map
+		player = self.engine.player
+		self.time += self.delay(player, player_cost)
+		if game_map is not self._game_map:
+			# seeded after the clock moves, so no first turn falls before this phase and gets run twice
+			self._reset(game_map)
+
+		for actor in game_map.get_actors_within_steps(player.x, player.y, ACTIVITY_RADIUS):
+			if actor is not player:
+				self.wake(actor, 0)
+
+		while self.queue and self.queue[0][0] <= self.time:
+			due, _, actor = heapq.heappop(self.queue)
+			if self.due.get(actor) != due:
+				continue # rescheduled since this entry was pushed
+			if not actor.is_alive or actor.parent is not game_map:
+				del self.due[actor]
+				self.awake.pop(actor, None)
+				continue
+
+			action = actor.ai.get_action()
+			try:
+				action.perform()
+			except exceptions.Impossible:
+				pass # ignore impossible actions from enemy ai
+
+			delay = self.delay(actor, action.cost)
+			if actor in self.awake and self.awake[actor] < self.time and actor.ai is not None and actor.ai.idle:
+				del self.awake[actor]
+			if actor not in self.awake:
+				delay *= DORMANT_INTERVAL
+			self.schedule(actor, due + delay)
@@ -0,0 +1,43 @@
+from typing import Optional
+import color
+from engine import Engine
+import entity_factories
+from procgen import generate_dungeon
+from rng import RandomStreams
+
+def new_game(
+	map_width: int = 64,
+	map_height: int = 64,
+	room_max_size: int = 16,
+	room_min_size: int = 8,
+	max_rooms: int = 32,
+	max_monsters_per_room: int = 3,
+	max_items_per_room: int = 5,
+	chunk_size: Optional[int] = None,
+	seed: Optional[int] = None
+) -> Engine:
+	# builds a fresh engine with a generated first level, independent of any window
+	player = entity_factories.player.build()
+
+	engine = Engine(player = player, rng = RandomStreams(seed))
+
+	engine.game_map = generate_dungeon(
+		max_rooms = max_rooms,
+		room_min_size = room_min_size,
+		room_max_size = room_max_size,
+		map_width = map_width,
+		map_height = map_height,
+		max_monsters_per_room = max_monsters_per_room,
+		max_items_per_room = max_items_per_room,
+		engine = engine,
+		chunk_size = chunk_size
+	)
+
+	engine.update_fov()
+
+	engine.message_log.add_message(
+		"Somewhere in this asteroid's wretched tunnels, the notorious Pirate Captain Morgan makes his escape.",
+		color.welcome_text
+	)
+
+	return engine
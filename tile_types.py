@@ -1,4 +1,4 @@
-from typing import Tuple
+from typing import List, Tuple
 import numpy as np
 
 # graphics structure defined in Console.tiles_rgb
@@ -15,14 +15,19 @@ tile_dt = np.dtype([
 		("light", graphic_dt),
 	])
 
+# every tile definition, in ID order, GameMap.tiles stores these IDs instead of whole tile_dt records
+_tile_definitions: List[np.ndarray] = []
+
+# registers a tile definition and returns its ID
 def new_tile(
 	*,
 	walkable: int,
 	transparent: int,
 	dark: Tuple[int, Tuple[int, int, int], Tuple[int, int, int]],
 	light: Tuple[int, Tuple[int, int, int], Tuple[int, int, int]]
-) -> np.ndarray:
-	return np.array( (walkable, transparent, dark, light), dtype=tile_dt )
+) -> int:
+	_tile_definitions.append( np.array( (walkable, transparent, dark, light), dtype=tile_dt ) )
+	return len(_tile_definitions) - 1
 
 # unexplored, unseen tiles
 SHROUD = np.array( (ord(" "), (255, 255, 255), (0, 0, 0)), dtype=graphic_dt )
@@ -38,4 +43,10 @@ wall = new_tile(
 	transparent=False,
 	dark=( ord(" "), (255, 255, 255), (108, 96, 96) ),
 	light=( ord(" "), (255, 255, 255), (192, 200, 208) )
-)
\ No newline at end of file
+)
+
+# lookup table indexed by tile ID
+tile_table = np.array(_tile_definitions, dtype=tile_dt)
+
+# graphics indexed by [tile ID, state], where state is 0 when unexplored, 1 when explored and 2 when visible
+tile_graphics = np.stack( [np.full(len(tile_table), SHROUD), tile_table["dark"], tile_table["light"]], axis=1 )